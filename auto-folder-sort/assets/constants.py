@@ -13,9 +13,17 @@ MONTHS = {
     "Dec": "(12)",
 }
 
+# Names of the month folders generated for date sorting, e.g. "(1) Jan",
+# where the folder for month number n is at index n - 1
+MONTH_FOLDERS = tuple(f"{number} {month}" for month, number in MONTHS.items())
+
 
 FILE_FOLDERS = {
     "Folders & Archives": [
+        "tar.gz",
+        "tar.bz2",
+        "tar.xz",
+        "tgz",
         "zip",
         "z",
         "gz",
@@ -0,0 +1,101 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MoveExecutor:
+    """Runs the moves planned by a Sorter on a bounded thread pool.
+
+    Errors are isolated per move, so one item which can't be moved doesn't
+    stop the rest of the items from being sorted.
+    """
+
+    def __init__(self, max_workers: int = 1, per_device: bool = False) -> None:
+        """
+        max_workers: Most moves run at the same time (per device if per_device)
+
+        per_device: If True, moves are grouped by the device of their destination
+                    and each device gets its own pool, so slow copies to one
+                    device don't hold up renames on another
+        """
+
+        self.max_workers = max_workers
+        self.per_device = per_device
+
+        # Device of each destination folder, only looked up once
+        self.devices: dict = {}
+
+    def device(self, path: str):
+        """Returns the device the folder path is moved into is on, or None if
+        it can't be found."""
+
+        folder = os.path.dirname(path)
+
+        if folder not in self.devices:
+            # Destination folder may not exist yet if created lazily
+            existing = folder
+            while not os.path.isdir(existing) and os.path.dirname(existing) != existing:
+                existing = os.path.dirname(existing)
+
+            try:
+                self.devices[folder] = os.stat(existing).st_dev
+            except OSError:
+                self.devices[folder] = None
+
+        return self.devices[folder]
+
+    @staticmethod
+    def run_one(move, old_path: str, new_path: str, errors: list) -> None:
+        try:
+            move(old_path, new_path)
+        except OSError as error:
+            errors.append((old_path, new_path, error))
+
+    def run(self, move, moves: list) -> list:
+        """Calls move(old_path, new_path) for each (old_path, new_path, ...)
+        tuple in moves, e.g. a Sorter's planned Moves.
+
+        Returns a list of (old_path, new_path, error) for the moves that failed.
+        Any other exception raised by move is raised once every move is done.
+        """
+
+        errors: list = []
+
+        if self.max_workers <= 1 and not self.per_device:
+            unexpected = None
+
+            for old_path, new_path, *_ in moves:
+                try:
+                    self.run_one(move, old_path, new_path, errors)
+                except Exception as error:
+                    # Kept until the rest are moved, like in a pool
+                    if unexpected is None:
+                        unexpected = error
+
+            if unexpected is not None:
+                raise unexpected
+
+            return errors
+
+        groups: dict = {}
+        for old_path, new_path, *_ in moves:
+            key = self.device(new_path) if self.per_device else None
+            groups.setdefault(key, []).append((old_path, new_path))
+
+        pools = [ThreadPoolExecutor(max_workers=self.max_workers) for _ in groups]
+        futures = []
+
+        try:
+            for pool, group in zip(pools, groups.values()):
+                for old_path, new_path in group:
+                    futures.append(
+                        pool.submit(self.run_one, move, old_path, new_path, errors)
+                    )
+        finally:
+            for pool in pools:
+                pool.shutdown(wait=True)
+
+        # Errors other than OSError are raised, the same as when run one by one
+        for future in futures:
+            future.result()
+
+        return errors
@@ -0,0 +1,50 @@
+from types import MappingProxyType
+
+# If being run directly or by running sorter_test.py, assets.constants
+# will fail so use import constants instead
+try:
+    import assets.constants as constants
+except ImportError:
+    import constants
+
+
+def build_extension_index(file_folders: dict) -> MappingProxyType:
+    """Returns a read only dict mapping every extension in file_folders
+    (lower case, without the leading dot) to the folder it is sorted into.
+
+    If an extension is listed under more than one folder, the first folder wins.
+    """
+
+    index = {}
+
+    for file_type, extensions in file_folders.items():
+        for extension in extensions:
+            index.setdefault(extension.lower(), file_type)
+
+    return MappingProxyType(index)
+
+
+EXTENSION_INDEX = build_extension_index(constants.FILE_FOLDERS)
+
+# Most dot separated parts in a single extension, e.g. 2 for tar.gz
+MAX_SUFFIX_PARTS = max((ext.count(".") + 1 for ext in EXTENSION_INDEX), default=1)
+
+
+def lookup(name: str, index=EXTENSION_INDEX):
+    """Returns the folder a file name is sorted into based on its extension,
+    or None if the extension is not in index.
+
+    Matching is case insensitive and multi-part extensions (e.g. tar.gz)
+    are checked before single ones.
+    """
+
+    # Leading dots mark hidden files, not extensions
+    parts = name.lstrip(".").lower().split(".")
+
+    for count in range(min(MAX_SUFFIX_PARTS, len(parts) - 1), 0, -1):
+        file_type = index.get(".".join(parts[-count:]))
+
+        if file_type is not None:
+            return file_type
+
+    return None
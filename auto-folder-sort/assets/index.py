@@ -0,0 +1,249 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value
+);
+CREATE TABLE IF NOT EXISTS placements (
+    inode INTEGER,
+    mtime_ns INTEGER,
+    name TEXT,
+    destination TEXT,
+    PRIMARY KEY (inode, mtime_ns)
+);
+CREATE TABLE IF NOT EXISTS snapshot (
+    name TEXT PRIMARY KEY,
+    inode INTEGER,
+    mtime_ns INTEGER
+);
+"""
+
+# Most placements kept, the oldest being dropped once there are more
+PLACEMENTS_LIMIT = 100000
+
+# Placements waiting to be written before they are written without waiting
+# for self.flush_placements()
+PLACEMENTS_BATCH = 1000
+
+
+def index_path(state_folder: str, folder: str) -> str:
+    """Returns the path of the index file for a tracked folder."""
+
+    digest = hashlib.sha1(os.path.normpath(folder).encode()).hexdigest()
+
+    return os.path.join(state_folder, f"{digest[:16]}.sqlite3")
+
+
+class PlacementIndex:
+    """On-disk record of what a Sorter has done in one tracked folder, kept
+    in an SQLite database so it survives restarts.
+
+    Holds the inode and mtime of the tracked folder when it was last fully
+    sorted, so a startup sort can be skipped if nothing has been added or
+    removed since, along with the inode, mtime and destination of the last
+    PLACEMENTS_LIMIT items sorted. Placements are buffered and written in
+    batches, as writing each on its own would sync the database every time.
+
+    Also holds a snapshot of the items deliberately left in place in the
+    folder, keyed by name, inode and mtime. It is kept in memory while
+    running and only written by self.save_snapshot(), e.g. at shutdown, so
+    a startup sort only has to handle the items missing from the snapshot.
+    """
+
+    def __init__(self, path: str, folder: str, config: str = "") -> None:
+        """
+        path: Database file, created if it doesn't exist
+
+        folder: Tracked folder the index is for
+
+        config: Description of how the folder is sorted (e.g. sort type and
+                earliest year). The folder is treated as changed if this
+                differs from the config it was last sorted with
+        """
+
+        self.path = path
+        self.folder = folder
+        self.config = config
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+
+        # (old_path, new_path) of each move not written yet
+        self.pending: list = []
+
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+        self.load_snapshot()
+
+    def load_snapshot(self) -> None:
+        """Reads the snapshot of items left in place from the database, e.g.
+        after another process has sorted the folder. The snapshot is ignored
+        if the folder was last sorted with a different config, as the items
+        left in place then may not be now."""
+
+        if self.get("config") not in (None, self.config):
+            self.snapshot = {}
+            return
+
+        with self.lock:
+            # Name -> (inode, mtime) of each item left in place
+            self.snapshot: dict = {
+                name: (inode, mtime_ns)
+                for name, inode, mtime_ns in self.connection.execute(
+                    "SELECT name, inode, mtime_ns FROM snapshot"
+                )
+            }
+
+    @staticmethod
+    def key(stat_result: os.stat_result) -> tuple:
+        return stat_result.st_ino, stat_result.st_mtime_ns
+
+    def signature(self) -> tuple:
+        """Returns the (inode, mtime) of the tracked folder. Its mtime changes
+        whenever an item is added to, removed from or renamed inside it."""
+
+        return self.key(os.stat(self.folder))
+
+    def get(self, key: str):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM state WHERE key = ?", (key,)
+            ).fetchone()
+
+        return row[0] if row is not None else None
+
+    def unchanged(self) -> bool:
+        """Returns whether the tracked folder is exactly as it was left the
+        last time self.mark_sorted() was called."""
+
+        try:
+            inode, mtime_ns = self.signature()
+        except OSError:
+            return False
+
+        return (
+            self.get("config") == self.config
+            and self.get("inode") == inode
+            and self.get("mtime_ns") == mtime_ns
+        )
+
+    def mark_sorted(self, signature: tuple = None) -> None:
+        """Records the state of the tracked folder as fully sorted.
+
+        signature: self.signature() taken before the folder was listed for
+                   the sort, so anything added while sorting makes it look
+                   changed. Defaults to its current signature
+        """
+
+        inode, mtime_ns = signature if signature is not None else self.signature()
+
+        self.flush_placements()
+
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO state VALUES (?, ?)",
+                [("config", self.config), ("inode", inode), ("mtime_ns", mtime_ns)],
+            )
+
+    def record_placements(self, moves: list) -> None:
+        """Records where each item in moves, a list of (old_path, new_path, ...)
+        tuples which have been carried out, was sorted to. They are written by
+        the next call of self.flush_placements(), or once PLACEMENTS_BATCH are
+        waiting."""
+
+        with self.lock:
+            self.pending.extend((move[0], move[1]) for move in moves)
+            full = len(self.pending) >= PLACEMENTS_BATCH
+
+        if full:
+            self.flush_placements()
+
+    def flush_placements(self) -> None:
+        """Writes the placements recorded since the last call in a single
+        transaction, then drops the oldest beyond PLACEMENTS_LIMIT."""
+
+        with self.lock:
+            pending, self.pending = self.pending, []
+
+        if not pending:
+            return
+
+        rows = []
+        for old_path, new_path in pending:
+            # Items moved again or deleted since are not recorded
+            try:
+                inode, mtime_ns = self.key(os.lstat(new_path))
+            except OSError:
+                continue
+
+            rows.append((inode, mtime_ns, os.path.basename(old_path), new_path))
+
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO placements VALUES (?, ?, ?, ?)", rows
+            )
+            self.connection.execute(
+                "DELETE FROM placements WHERE rowid <= "
+                "(SELECT MAX(rowid) FROM placements) - ?",
+                (PLACEMENTS_LIMIT,),
+            )
+
+    def keep(self, entry) -> None:
+        """Adds entry (an os.DirEntry) to the snapshot, as it is meant to stay
+        where it is."""
+
+        self.snapshot[entry.name] = self.key(entry.stat(follow_symlinks=False))
+
+    def is_kept(self, entry) -> bool:
+        """Returns whether entry was kept in place by an earlier sort and has
+        not been replaced or modified since."""
+
+        kept = self.snapshot.get(entry.name)
+
+        return kept is not None and kept == self.key(entry.stat(follow_symlinks=False))
+
+    def delta(self, entries: list) -> list:
+        """Returns the entries which are not in the snapshot, i.e. which were
+        added or modified since it was taken. Items in the snapshot which are
+        no longer in entries are dropped from it."""
+
+        changed = []
+        snapshot = {}
+
+        for entry in entries:
+            try:
+                if self.is_kept(entry):
+                    snapshot[entry.name] = self.snapshot[entry.name]
+                    continue
+            except FileNotFoundError:
+                continue
+
+            changed.append(entry)
+
+        self.snapshot = snapshot
+
+        return changed
+
+    def save_snapshot(self) -> None:
+        """Writes the snapshot of items left in place, and any placements not
+        written yet, to the database."""
+
+        self.flush_placements()
+
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM snapshot")
+            self.connection.executemany(
+                "INSERT INTO snapshot VALUES (?, ?, ?)",
+                [(name, *key) for name, key in self.snapshot.items()],
+            )
+
+    def close(self) -> None:
+        self.flush_placements()
+
+        with self.lock:
+            self.connection.close()
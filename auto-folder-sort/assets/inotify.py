@@ -0,0 +1,236 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    DirModifiedEvent,
+    DirMovedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+    FileSystemEvent,
+)
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+# Event type of FileClosedEvent, which watchdog has no event for
+EVENT_TYPE_CLOSED = "closed"
+
+# struct inotify_event, followed by a name of `len` bytes
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+class FileClosedEvent(FileSystemEvent):
+    """A file was closed after being written to (IN_CLOSE_WRITE)."""
+
+    event_type = EVENT_TYPE_CLOSED
+    is_directory = False
+
+
+class InotifyWatch:
+    """Returned by InotifyLoop.schedule(), for use with InotifyLoop.unschedule()."""
+
+    def __init__(self, path: str, wd: int) -> None:
+        self.path = path
+        self.wd = wd
+        self.is_recursive = False
+
+
+class InotifyLoop(threading.Thread):
+    """Watches the top level of any number of folders with a single inotify
+    instance and a single thread, dispatching watchdog events to the handler
+    scheduled for each folder. Files closed after being written to are also
+    reported, as a FileClosedEvent.
+
+    Can be used in place of a watchdog Observer, as it has the same
+    schedule, unschedule, start, stop and join methods. Only available
+    on Linux.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(daemon=True)
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            self.raise_errno("inotify_init1")
+
+        # Written to by self.stop() to wake the thread up
+        self.stop_read, self.stop_write = os.pipe()
+        self.stopping = False
+
+        # Watch descriptor -> (InotifyWatch, event handler)
+        self.watches: dict = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def raise_errno(function: str, path: str = None):
+        error = ctypes.get_errno()
+        raise OSError(error, f"{function}: {os.strerror(error)}", path)
+
+    def schedule(self, event_handler, path: str, recursive: bool = False):
+        """Starts watching path (but not its subfolders) for event_handler.
+
+        recursive is only accepted for compatibility with watchdog Observers.
+        """
+
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            self.raise_errno("inotify_add_watch", path)
+
+        watch = InotifyWatch(os.path.normpath(path), wd)
+
+        with self.lock:
+            self.watches[wd] = (watch, event_handler)
+
+        return watch
+
+    def unschedule(self, watch: InotifyWatch) -> None:
+        with self.lock:
+            if self.watches.pop(watch.wd, None) is not None:
+                self.libc.inotify_rm_watch(self.fd, watch.wd)
+
+    def stop(self) -> None:
+        self.stopping = True
+        os.write(self.stop_write, b"\0")
+
+    def run(self) -> None:
+        try:
+            while not self.stopping:
+                readable, _, _ = select.select([self.fd, self.stop_read], [], [])
+
+                if self.fd in readable:
+                    self.read_events()
+        finally:
+            for fd in (self.fd, self.stop_read, self.stop_write):
+                os.close(fd)
+
+    def read_events(self) -> None:
+        """Reads and dispatches every event currently queued by inotify."""
+
+        try:
+            buffer = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+
+        # Moves are reported as a "moved from" and a "moved to" event with
+        # the same cookie, which are paired up into a single moved event
+        moved_from: dict = {}
+
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.overflow()
+                continue
+
+            with self.lock:
+                watch, handler = self.watches.get(wd, (None, None))
+
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+
+            if watch is None:
+                continue
+
+            path = os.path.join(watch.path, name) if name else watch.path
+            is_dir = bool(mask & IN_ISDIR)
+
+            if mask & IN_MOVED_FROM:
+                moved_from[cookie] = (path, is_dir, watch, handler)
+            elif mask & IN_MOVED_TO:
+                self.dispatch_moved_to(
+                    moved_from.pop(cookie, None), path, is_dir, watch, handler
+                )
+            elif mask & IN_CREATE:
+                created = DirCreatedEvent if is_dir else FileCreatedEvent
+                handler.dispatch(created(path))
+                handler.dispatch(DirModifiedEvent(watch.path))
+            elif mask & IN_DELETE:
+                deleted = DirDeletedEvent if is_dir else FileDeletedEvent
+                handler.dispatch(deleted(path))
+                handler.dispatch(DirModifiedEvent(watch.path))
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                handler.dispatch(DirDeletedEvent(watch.path))
+            elif mask & (IN_MODIFY | IN_ATTRIB) and name:
+                modified = DirModifiedEvent if is_dir else FileModifiedEvent
+                handler.dispatch(modified(path))
+            elif mask & IN_CLOSE_WRITE and name:
+                handler.dispatch(FileClosedEvent(path))
+
+        # Items moved out of the watched folders
+        for path, is_dir, watch, handler in moved_from.values():
+            deleted = DirDeletedEvent if is_dir else FileDeletedEvent
+            handler.dispatch(deleted(path))
+            handler.dispatch(DirModifiedEvent(watch.path))
+
+    def dispatch_moved_to(self, source, path, is_dir, watch, handler) -> None:
+        """Dispatches the events for an item moved to path, where source is
+        the matching "moved from" event, or None if it came from an unwatched
+        folder."""
+
+        if source is not None and source[2] is watch:
+            moved = DirMovedEvent if is_dir else FileMovedEvent
+            handler.dispatch(moved(source[0], path))
+            handler.dispatch(DirModifiedEvent(watch.path))
+            return
+
+        # Moved between two watched folders, so each only sees its own half
+        if source is not None:
+            source_path, source_is_dir, source_watch, source_handler = source
+            deleted = DirDeletedEvent if source_is_dir else FileDeletedEvent
+            source_handler.dispatch(deleted(source_path))
+            source_handler.dispatch(DirModifiedEvent(source_watch.path))
+
+        created = DirCreatedEvent if is_dir else FileCreatedEvent
+        handler.dispatch(created(path))
+        handler.dispatch(DirModifiedEvent(watch.path))
+
+    def overflow(self) -> None:
+        """Events have been lost, so every folder has to be fully sorted.
+        Handlers must only queue the sort, as no events are read meanwhile."""
+
+        with self.lock:
+            handlers = [handler for _, handler in self.watches.values()]
+
+        for handler in handlers:
+            if hasattr(handler, "on_overflow"):
+                handler.on_overflow()
@@ -0,0 +1,61 @@
+import math
+import threading
+from bisect import bisect_left
+
+# Upper bounds (in seconds) of the histogram buckets, from 1 ms up to about
+# 2 minutes, each 25% wider than the last. Percentiles are accurate to a bucket
+BUCKETS = tuple(0.001 * 1.25**i for i in range(53))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """Fixed size histogram of latencies, from which percentiles can be
+    estimated without keeping every sample."""
+
+    def __init__(self) -> None:
+        # Last bucket holds anything slower than BUCKETS[-1]
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self.lock:
+            self.buckets[bisect_left(BUCKETS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, quantile: float) -> float:
+        """Returns the upper bound of the bucket holding the given quantile
+        (0 to 1) of the samples, or 0.0 if there are none."""
+
+        with self.lock:
+            if not self.count:
+                return 0.0
+
+            rank = max(1, math.ceil(quantile * self.count))
+
+            seen = 0
+            for index, count in enumerate(self.buckets):
+                seen += count
+                if seen >= rank:
+                    break
+
+            # Never report more than the slowest sample actually seen
+            if index == len(BUCKETS):
+                return self.max
+            return min(BUCKETS[index], self.max)
+
+    def summary(self) -> dict:
+        """Returns the count, p50, p95, p99 and max of the samples."""
+
+        result = {"count": self.count, "max": self.max}
+
+        for quantile in QUANTILES:
+            result[f"p{round(quantile * 100)}"] = self.percentile(quantile)
+
+        return result
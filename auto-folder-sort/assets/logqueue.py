@@ -0,0 +1,46 @@
+import atexit
+import json
+import logging
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats a record as a single line of JSON, holding its time and the
+    fields given as `extra={"fields": {...}}` when it was logged."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {"time": datetime.fromtimestamp(record.created).isoformat()}
+        line.update(getattr(record, "fields", {}))
+
+        return json.dumps(line)
+
+
+class Listener(QueueListener):
+    """QueueListener which can be stopped more than once, as it is stopped
+    at exit even if it was already stopped."""
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            super().stop()
+
+
+def listen(logger: logging.Logger, *handlers: logging.Handler) -> Listener:
+    """Makes logger hand its records to a queue, which a background thread
+    passes on to handlers, so slow handlers (e.g. file writes) never block
+    the thread logging.
+
+    Returns the started Listener, which is also stopped when the
+    program exits so records still queued are written.
+    """
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    listener = Listener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger.addHandler(QueueHandler(log_queue))
+
+    return listener
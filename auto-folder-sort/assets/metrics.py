@@ -0,0 +1,275 @@
+import contextlib
+import os
+import socketserver
+import threading
+import time
+
+try:
+    from assets.latency import QUANTILES, LatencyHistogram
+except ImportError:
+    from latency import QUANTILES, LatencyHistogram
+
+PREFIX = "auto_folder_sort"
+
+# Returned by Sorter.timer() when metrics are disabled, so timed blocks cost
+# nothing more than entering an empty context manager
+NO_TIMER = contextlib.nullcontext()
+
+
+def escape(value) -> str:
+    """Escapes a label value for the Prometheus text format."""
+
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+class Timer:
+    """Context manager adding the time spent inside of it to a summary."""
+
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics, name: str, labels: dict) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+
+class Metrics:
+    """Counters and timers (summaries of durations, in seconds) for a running
+    program, which can be collected as a list of samples or formatted in the
+    Prometheus text format.
+
+    Each metric can have any number of labels, e.g. the folder it is for.
+    LatencyHistograms are exported as summaries with quantiles.
+    """
+
+    def __init__(self, prefix: str = PREFIX) -> None:
+        self.prefix = prefix
+
+        # name -> {labels: value}, name -> {labels: [count, sum]} and
+        # name -> {labels: LatencyHistogram}
+        self.counters: dict = {}
+        self.summaries: dict = {}
+        self.histograms: dict = {}
+
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Adds value to a counter."""
+
+        key = tuple(sorted(labels.items()))
+
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Adds a duration to a summary."""
+
+        key = tuple(sorted(labels.items()))
+
+        with self.lock:
+            series = self.summaries.setdefault(name, {})
+            summary = series.setdefault(key, [0, 0.0])
+            summary[0] += 1
+            summary[1] += seconds
+
+    def timer(self, name: str, **labels) -> Timer:
+        """Returns a context manager timing its block into the summary name."""
+
+        return Timer(self, name, labels)
+
+    def histogram(self, name: str, **labels) -> LatencyHistogram:
+        """Returns the LatencyHistogram for name and labels, creating it the
+        first time."""
+
+        key = tuple(sorted(labels.items()))
+
+        with self.lock:
+            return self.histograms.setdefault(name, {}).setdefault(
+                key, LatencyHistogram()
+            )
+
+    def collect(self) -> list:
+        """Returns every sample as (name, labels, value), with each summary
+        giving a name_count and a name_sum sample, and each histogram also
+        giving a name sample per quantile."""
+
+        samples = []
+
+        with self.lock:
+            for name, series in self.counters.items():
+                for key, value in series.items():
+                    samples.append((f"{self.prefix}_{name}", dict(key), value))
+
+            for name, series in self.summaries.items():
+                for key, (count, total) in series.items():
+                    samples.append((f"{self.prefix}_{name}_count", dict(key), count))
+                    samples.append((f"{self.prefix}_{name}_sum", dict(key), total))
+
+            for name, series in self.histograms.items():
+                full_name = f"{self.prefix}_{name}"
+
+                for key, histogram in series.items():
+                    labels = dict(key)
+
+                    for quantile in QUANTILES:
+                        value = histogram.percentile(quantile)
+                        samples.append(
+                            (full_name, {**labels, "quantile": str(quantile)}, value)
+                        )
+
+                    samples.append((f"{full_name}_count", labels, histogram.count))
+                    samples.append((f"{full_name}_sum", labels, histogram.total))
+
+        return samples
+
+    def to_prometheus(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+
+        lines = []
+
+        with self.lock:
+            for kind, metrics in (
+                ("counter", self.counters),
+                ("summary", self.summaries),
+                ("summary", self.histograms),
+            ):
+                for name, series in sorted(metrics.items()):
+                    full_name = f"{self.prefix}_{name}"
+                    lines.append(f"# TYPE {full_name} {kind}")
+
+                    for key, value in sorted(series.items()):
+                        labels = format_labels(key)
+
+                        if kind == "counter":
+                            lines.append(f"{full_name}{labels} {value}")
+                            continue
+
+                        if isinstance(value, LatencyHistogram):
+                            for quantile in QUANTILES:
+                                quantile_labels = format_labels(
+                                    key + (("quantile", quantile),)
+                                )
+                                lines.append(
+                                    f"{full_name}{quantile_labels} "
+                                    f"{value.percentile(quantile)}"
+                                )
+
+                            value = (value.count, value.total)
+
+                        lines.append(f"{full_name}_count{labels} {value[0]}")
+                        lines.append(f"{full_name}_sum{labels} {value[1]}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Writes the metrics to path, replacing it in one step so readers
+        never see a partially written file."""
+
+        temporary_path = f"{path}.tmp"
+
+        with open(temporary_path, "w") as file:
+            file.write(self.to_prometheus())
+
+        os.replace(temporary_path, path)
+
+
+class FileExporter(threading.Thread):
+    """Writes metrics to a file every `interval` seconds, e.g. for the node
+    exporter's textfile collector, and once more when stopped."""
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 15.0) -> None:
+        super().__init__(daemon=True)
+
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopping = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopping.wait(self.interval):
+            self.metrics.write(self.path)
+
+    def stop(self) -> None:
+        self.stopping.set()
+        self.join()
+        self.metrics.write(self.path)
+
+
+class MetricsRequestHandler(socketserver.StreamRequestHandler):
+    """Answers each connection with the current metrics. HTTP requests get an
+    HTTP response, so Prometheus can scrape the socket directly."""
+
+    timeout = 1.0
+
+    def handle(self) -> None:
+        try:
+            request_line = self.rfile.readline()
+        except OSError:
+            request_line = b""
+
+        body = self.server.metrics.to_prometheus().encode()
+
+        if request_line.startswith(b"GET"):
+            self.wfile.write(
+                b"HTTP/1.0 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+            )
+
+        self.wfile.write(body)
+
+
+class MetricsTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class MetricsUnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class SocketExporter:
+    """Serves metrics on a TCP (host, port) address, or a Unix socket if
+    address is a path, from a background thread."""
+
+    def __init__(self, metrics: Metrics, address) -> None:
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.unlink(address)
+            server_class = MetricsUnixServer
+        else:
+            server_class = MetricsTCPServer
+
+        self.address = address
+        self.server = server_class(address, MetricsRequestHandler)
+        self.server.metrics = metrics
+
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
@@ -0,0 +1,156 @@
+import errno
+import os
+import shutil
+import threading
+
+# Errors from os.rename where shutil.move behaves differently, e.g. by moving
+# the item inside of an existing folder with the same name
+RENAME_FALLBACK_ERRORS = (errno.EEXIST, errno.ENOTEMPTY, errno.EISDIR, errno.ENOTDIR)
+
+# Errors meaning a kernel copy function can't be used for a pair of files
+KERNEL_COPY_ERRORS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP)
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class Mover:
+    """Moves items with a single os.rename when the source and destination
+    folders are on the same device, and a streamed copy when they are not.
+
+    Devices are only looked up once per folder. Counts of renames, copies
+    and bytes copied are kept until self.reset_stats() is called.
+    """
+
+    def __init__(self) -> None:
+        self.devices: dict = {}
+        self.lock = threading.Lock()
+
+        self.renames = 0
+        self.copies = 0
+        self.bytes_copied = 0
+
+    def reset_stats(self) -> dict:
+        """Returns the stats counted since the last reset, and resets them."""
+
+        with self.lock:
+            stats = {
+                "renames": self.renames,
+                "copies": self.copies,
+                "bytes_copied": self.bytes_copied,
+            }
+            self.renames = self.copies = self.bytes_copied = 0
+
+        return stats
+
+    def device(self, folder: str):
+        """Returns the device folder is on, only looking it up the first time."""
+
+        if folder not in self.devices:
+            self.devices[folder] = os.stat(folder).st_dev
+
+        return self.devices[folder]
+
+    def move(self, old_path: str, new_path: str) -> None:
+        """Moves the item at old_path to new_path, whose folder must exist."""
+
+        same_device = self.device(os.path.dirname(old_path)) == self.device(
+            os.path.dirname(new_path)
+        )
+
+        if same_device:
+            try:
+                os.rename(old_path, new_path)
+            except OSError as error:
+                if error.errno in RENAME_FALLBACK_ERRORS:
+                    shutil.move(old_path, new_path)
+                # Different mount points of the same filesystem share a device
+                elif error.errno != errno.EXDEV:
+                    raise
+                else:
+                    self.copy(old_path, new_path)
+                    return
+
+            with self.lock:
+                self.renames += 1
+            return
+
+        self.copy(old_path, new_path)
+
+    def copy(self, old_path: str, new_path: str) -> None:
+        """Moves an item to another device by copying it, then removing it."""
+
+        if os.path.isdir(new_path):
+            # Let shutil handle moving inside of an existing folder
+            shutil.move(old_path, new_path)
+        elif os.path.islink(old_path):
+            os.symlink(os.readlink(old_path), new_path)
+            os.unlink(old_path)
+        elif os.path.isdir(old_path):
+            shutil.copytree(
+                old_path, new_path, symlinks=True, copy_function=self.copy_file
+            )
+            shutil.rmtree(old_path)
+        else:
+            self.copy_file(old_path, new_path)
+            os.unlink(old_path)
+
+        with self.lock:
+            self.copies += 1
+
+    def copy_file(self, old_path: str, new_path: str) -> str:
+        """Copies a file's contents and metadata. Contents are streamed within
+        the kernel where possible, so they never pass through Python."""
+
+        with open(old_path, "rb") as old_file, open(new_path, "wb") as new_file:
+            copied = stream(old_file.fileno(), new_file.fileno())
+
+        shutil.copystat(old_path, new_path)
+
+        with self.lock:
+            self.bytes_copied += copied
+
+        return new_path
+
+
+def sendfile(in_fd: int, out_fd: int, count: int) -> int:
+    """os.sendfile with the same arguments as os.copy_file_range."""
+
+    return os.sendfile(out_fd, in_fd, None, count)
+
+
+# Functions copying between file descriptors within the kernel, in order of
+# preference, taking (in_fd, out_fd, count) and returning bytes copied
+KERNEL_COPIES = []
+if hasattr(os, "copy_file_range"):
+    KERNEL_COPIES.append(os.copy_file_range)
+if hasattr(os, "sendfile"):
+    KERNEL_COPIES.append(sendfile)
+
+
+def stream(in_fd: int, out_fd: int) -> int:
+    """Copies everything from in_fd to out_fd, returning the number of bytes
+    copied. Uses os.copy_file_range, then os.sendfile, then plain reads and
+    writes, depending on what the platform and filesystems support."""
+
+    for kernel_copy in KERNEL_COPIES:
+        copied = 0
+
+        try:
+            while True:
+                sent = kernel_copy(in_fd, out_fd, COPY_CHUNK_SIZE)
+                if not sent:
+                    return copied
+                copied += sent
+
+        except OSError as error:
+            # Only fall back if nothing has been written yet
+            if copied or error.errno not in KERNEL_COPY_ERRORS:
+                raise
+
+    copied = 0
+    while True:
+        chunk = os.read(in_fd, COPY_CHUNK_SIZE)
+        if not chunk:
+            return copied
+        os.write(out_fd, chunk)
+        copied += len(chunk)
@@ -0,0 +1,365 @@
+import fnmatch
+import math
+import re
+import stat
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+# A single line of a rules file. folder is None for rules which leave
+# matching items where they are
+Rule = namedtuple("Rule", ["line", "kind", "text", "folder"])
+
+# Action which leaves matching items in place instead of moving them
+STAY = "stay"
+
+SIZE_UNITS = {
+    "b": 1,
+    "kb": 1000,
+    "mb": 1000**2,
+    "gb": 1000**3,
+    "tb": 1000**4,
+    "kib": 1024,
+    "mib": 1024**2,
+    "gib": 1024**3,
+    "tib": 1024**4,
+}
+
+AGE_UNITS = {
+    "s": 1,
+    "m": 60,
+    "h": 60 * 60,
+    "d": 24 * 60 * 60,
+    "w": 7 * 24 * 60 * 60,
+}
+
+# "> 1 GiB", "<= 30d" or a range such as "1 MiB..1 GiB"
+COMPARISON = re.compile(r"(<=|>=|<|>)\s*([\d.]+)\s*([a-z]*)", re.IGNORECASE)
+RANGE = re.compile(r"([\d.]+)\s*([a-z]*)\s*\.\.\s*([\d.]+)\s*([a-z]*)", re.IGNORECASE)
+
+# Globs which only look at the extension, e.g. "*.part" or "*.tar.gz"
+EXTENSION_GLOB = re.compile(r"\*\.([^*?\[\]]+)")
+
+# Literal start of a glob, and of a regex without alternatives of its own.
+# A regex's last literal character is dropped, as a quantifier may follow it
+GLOB_PREFIX = re.compile(r"[^*?\[]*")
+REGEX_PREFIX = re.compile(r"[\w\- ]*")
+
+# Flags at the start of a regex, e.g. "(?i)", which apply to the whole of it
+GLOBAL_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+
+
+def scope_flags(pattern: str) -> str:
+    """Returns pattern with the flags at its start (e.g. "(?i)invoice.*")
+    turned into a group they only apply to ("(?i:invoice.*)"), as global
+    flags can't be used once it is merged with other regexes."""
+
+    flags = ""
+    match = GLOBAL_FLAGS.match(pattern)
+
+    while match is not None:
+        flags += match.group(1)
+        pattern = pattern[match.end() :]
+        match = GLOBAL_FLAGS.match(pattern)
+
+    return f"(?{flags}:{pattern})" if flags else pattern
+
+
+def regex_group(index: int, pattern: str) -> str:
+    """Returns the group matching the names the regex rule at index in a
+    Rules matches, to be merged with the other rules."""
+
+    return f"(?P<_rule{index}>(?:{pattern})\\Z)"
+
+
+def parse_amount(number: str, unit: str, units: dict, default: str) -> float:
+    factor = units.get((unit or default).lower())
+
+    if factor is None:
+        raise ValueError(f"unknown unit {unit!r}, expected one of {list(units)}")
+
+    return float(number) * factor
+
+
+def parse_interval(text: str, units: dict, default: str, whole: bool = False):
+    """Returns the [low, high) interval described by a size or age condition,
+    e.g. "> 1 GiB" or "1 MiB..1 GiB" (both ends included).
+
+    whole: True for sizes, which are whole bytes, so "> n" starts at the
+           byte after n and "<= n" ends at it. Ages are close enough to
+           treat "> n" as ">= n"
+    """
+
+    comparison = COMPARISON.fullmatch(text)
+    between = RANGE.fullmatch(text)
+
+    if comparison is not None:
+        operator, number, unit = comparison.groups()
+        amount = parse_amount(number, unit, units, default)
+        after = math.floor(amount) + 1 if whole else amount
+
+        low, high = {
+            ">": (after, math.inf),
+            ">=": (amount, math.inf),
+            "<": (0, amount),
+            "<=": (0, after),
+        }[operator]
+    elif between is not None:
+        low = parse_amount(*between.group(1, 2), units, default)
+        high = parse_amount(*between.group(3, 4), units, default)
+
+        if whole:
+            high = math.floor(high) + 1
+    else:
+        raise ValueError(
+            f"expected a comparison such as '> 10 MiB' or a range, not {text!r}"
+        )
+
+    return low, high
+
+
+class IntervalIndex:
+    """Finds the first of a list of [low, high) intervals containing a value
+    with a binary search, instead of checking each interval in turn.
+
+    The boundaries of every interval split the number line into segments,
+    each of which is labelled with the first rule whose interval covers it.
+    """
+
+    def __init__(self, intervals: list, missing: int) -> None:
+        """
+        intervals: List of (rule index, low, high)
+
+        missing: Returned by self.lookup() when no interval contains the value
+        """
+
+        self.boundaries = sorted(
+            {bound for _, low, high in intervals for bound in (low, high)} - {math.inf}
+        )
+
+        # Segment i holds the values from boundaries[i - 1] up to boundaries[i]
+        self.segments = [missing] * (len(self.boundaries) + 1)
+
+        # Later rules are written first, so earlier ones overwrite them
+        for index, low, high in sorted(intervals, reverse=True):
+            start = bisect_left(self.boundaries, low) + 1
+            end = bisect_left(self.boundaries, high) + 1 if high != math.inf else None
+            self.segments[start:end] = [index] * len(self.segments[start:end])
+
+    def lookup(self, value: float) -> int:
+        return self.segments[bisect_right(self.boundaries, value)]
+
+
+class Rules:
+    """A list of rules compiled into a single matcher, which finds the first
+    rule matching an item without evaluating the rules one at a time:
+
+    - Globs which only check an extension (e.g. "*.pdf") are looked up in a
+      dict, like the extensions of the file type sort
+    - Other globs and regexes are merged into a regex alternation, each rule
+      being a named group, so the name is only scanned once. There is one
+      alternation per literal prefix the rules start with (e.g. "invoice_"
+      for "invoice_*.pdf"), looked up in a dict, so a name is only matched
+      against the rules it could match, plus one for rules with no prefix
+    - Size and age conditions are looked up with a binary search in an
+      IntervalIndex, and the item is only stat'ed when a size or age rule
+      comes before any rule its name matched
+
+    Globs and extensions are case insensitive. Regexes must match the whole
+    name and can't use numbered backreferences, as the groups are renumbered.
+    Flags at the start of a regex, e.g. "(?i)", only apply to that regex.
+    """
+
+    def __init__(self, rules: list) -> None:
+        self.rules = rules
+        missing = len(rules)
+
+        # Destination folders, which must never be sorted themselves
+        self.folders = frozenset(
+            rule.folder.split("/")[0] for rule in rules if rule.folder is not None
+        )
+
+        # Extension (lower case) -> index of the first rule for it
+        self.extensions: dict = {}
+        # Literal prefix (lower case) -> the regex alternatives starting with it
+        alternatives: dict = {}
+        sizes = []
+        ages = []
+
+        for index, rule in enumerate(rules):
+            if rule.kind == "glob":
+                extension = EXTENSION_GLOB.fullmatch(rule.text)
+
+                if extension is not None:
+                    self.extensions.setdefault(extension.group(1).lower(), index)
+                else:
+                    prefix = GLOB_PREFIX.match(rule.text).group()
+                    pattern = fnmatch.translate(rule.text)
+                    alternatives.setdefault(prefix.lower(), []).append(
+                        f"(?P<_rule{index}>(?i:{pattern}))"
+                    )
+            elif rule.kind == "regex":
+                prefix = ""
+                if "|" not in rule.text:
+                    prefix = REGEX_PREFIX.match(rule.text).group()[:-1]
+
+                alternatives.setdefault(prefix.lower(), []).append(
+                    regex_group(index, rule.text)
+                )
+            elif rule.kind == "size":
+                interval = parse_interval(rule.text, SIZE_UNITS, "b", whole=True)
+                sizes.append((index, *interval))
+            elif rule.kind == "age":
+                ages.append((index, *parse_interval(rule.text, AGE_UNITS, "d")))
+
+        self.max_suffix_parts = max(
+            (extension.count(".") + 1 for extension in self.extensions), default=0
+        )
+
+        self.names = {
+            prefix: re.compile("|".join(patterns))
+            for prefix, patterns in alternatives.items()
+        }
+        self.prefix_lengths = sorted({len(prefix) for prefix in self.names})
+        self.sizes = IntervalIndex(sizes, missing) if sizes else None
+        self.ages = IntervalIndex(ages, missing) if ages else None
+
+        # Items are only stat'ed if a name matches no rule before this one
+        self.first_stat_rule = min(
+            [index for index, _, _ in sizes + ages], default=missing
+        )
+
+    def match_name(self, name: str) -> int:
+        """Returns the index of the first glob or regex rule matching name,
+        or len(self.rules) if there is none."""
+
+        best = len(self.rules)
+
+        if self.max_suffix_parts:
+            # Leading dots mark hidden files, not extensions
+            parts = name.lstrip(".").lower().split(".")
+
+            for count in range(min(self.max_suffix_parts, len(parts) - 1), 0, -1):
+                index = self.extensions.get(".".join(parts[-count:]))
+
+                if index is not None and index < best:
+                    best = index
+
+        lowered = name.lower()
+
+        for length in self.prefix_lengths:
+            if length > len(name):
+                break
+
+            pattern = self.names.get(lowered[:length])
+            if pattern is None:
+                continue
+
+            match = pattern.match(name)
+            if match is not None:
+                best = min(best, int(match.lastgroup[5:]))
+
+        return best
+
+    def match(self, entry, now: float = None):
+        """Returns the first Rule matching entry (an os.DirEntry or PathEntry),
+        or None if no rule does.
+
+        now: Time ages are measured from, time.time() if not given
+        """
+
+        best = self.match_name(entry.name)
+
+        if best > self.first_stat_rule:
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                # Item was removed, so only its name can be matched
+                stat_result = None
+
+            if stat_result is not None:
+                # Sizes are only compared for files, not folders
+                if self.sizes is not None and not stat.S_ISDIR(stat_result.st_mode):
+                    best = min(best, self.sizes.lookup(stat_result.st_size))
+
+                if self.ages is not None:
+                    age = (time.time() if now is None else now) - stat_result.st_mtime
+                    best = min(best, self.ages.lookup(age))
+
+        if best == len(self.rules):
+            return None
+
+        return self.rules[best]
+
+
+def parse_rule(text: str, line: int) -> Rule:
+    """Returns the Rule for a line of a rules file, "<condition> | <action>".
+
+    Conditions are a glob ("invoice_*.pdf", or "glob <pattern>" if it starts
+    with one of the other keywords), "regex <pattern>", "size <comparison>"
+    or "age <comparison>", a comparison being e.g. "> 1 GiB", "<= 30d" or a
+    range such as "1 MiB..1 GiB". The action is the folder (relative to
+    the tracked folder) matching items are moved into, or "stay".
+    """
+
+    condition, separator, action = text.rpartition("|")
+    condition, action = condition.strip(), action.strip()
+
+    if not separator or not condition or not action:
+        raise ValueError("expected '<condition> | <folder or stay>'")
+
+    keyword, _, rest = condition.partition(" ")
+    if keyword in ("glob", "regex", "size", "age") and rest.strip():
+        kind, condition = keyword, rest.strip()
+    else:
+        kind = "glob"
+
+    if kind == "regex":
+        condition = scope_flags(condition)
+
+        # Compiled as it will be merged with the other rules, so any error
+        # names this line
+        try:
+            re.compile(regex_group(0, condition))
+        except re.error as error:
+            raise ValueError(f"invalid regex: {error}") from None
+    elif kind == "size":
+        parse_interval(condition, SIZE_UNITS, "b", whole=True)
+    elif kind == "age":
+        parse_interval(condition, AGE_UNITS, "d")
+
+    if action.lower() == STAY:
+        folder = None
+    else:
+        folder = action.replace("\\", "/").strip("/")
+
+        if action.startswith(("/", "\\")) or ".." in folder.split("/"):
+            raise ValueError(f"folder {action!r} must be inside the tracked folder")
+
+    return Rule(line, kind, condition, folder)
+
+
+def load_rules(path: str) -> Rules:
+    """Reads and compiles the rules file at path. Blank lines and lines
+    starting with # are ignored, and the first matching rule wins.
+
+    Raises ValueError naming the line of the first invalid rule.
+    """
+
+    rules = []
+
+    with open(path, "r") as file:
+        for number, text in enumerate(file, 1):
+            text = text.strip()
+            if not text or text.startswith("#"):
+                continue
+
+            try:
+                rules.append(parse_rule(text, number))
+            except ValueError as error:
+                raise ValueError(f"{path}, line {number}: {error}") from None
+
+    try:
+        return Rules(rules)
+    except re.error as error:
+        raise ValueError(f"Could not combine the rules in {path}: {error}") from None
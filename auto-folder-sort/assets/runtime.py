@@ -0,0 +1,172 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Items put on a folder's queue which are not paths
+STOP = object()
+RECONCILE = object()
+
+
+class FolderQueue:
+    """Feeds the events of one tracked folder into an asyncio.Queue.
+
+    Has the same notify, flush, events_received and runs attributes as a
+    DebouncedScheduler, so it can replace an event handler's scheduler.
+    notify() can be called from any thread, e.g. a watchdog observer's.
+    """
+
+    def __init__(self, loop, maxsize: int) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+        # Set when the queue was full, meaning events were dropped and
+        # the folder needs a full sort
+        self.overflowed = False
+
+        # Stats
+        self.events_received = 0
+        self.runs = 0
+
+    def notify(self, item=None) -> None:
+        self.loop.call_soon_threadsafe(self.put, item)
+
+    def put(self, item) -> None:
+        """Puts an item on the queue. Must be called from the event loop."""
+
+        if item is not RECONCILE:
+            self.events_received += 1
+
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def flush(self) -> None:
+        """Pending events are sorted by AsyncRuntime.shutdown() instead."""
+
+
+class AsyncRuntime:
+    """Sorts the events of every tracked folder from an asyncio event loop.
+
+    Each folder has its own bounded queue and sort task, which coalesces
+    bursts of events the same way a DebouncedScheduler does. Sorting
+    blocks, so it is run on a thread pool shared by every folder.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        queue_size: int = 10000,
+        quiet: float = 0.25,
+        max_latency: float = 2.0,
+    ) -> None:
+        """
+        workers: Number of threads shared by every folder for sorting
+
+        queue_size: Most events queued per folder. Once full, further events
+                    are dropped and the folder is fully sorted instead
+
+        quiet: Seconds without new events after which a burst is considered over
+
+        max_latency: Maximum seconds an event can wait before it is sorted
+        """
+
+        self.workers = workers
+        self.queue_size = queue_size
+        self.quiet = quiet
+        self.max_latency = max_latency
+
+        self.executor = ThreadPoolExecutor(workers)
+        self.queues: dict = {}
+        self.tasks: dict = {}
+
+    def add(self, handler) -> None:
+        """Starts handling the events for handler's folder, by replacing its
+        scheduler with a FolderQueue. Must be called from the event loop."""
+
+        folder_queue = FolderQueue(asyncio.get_running_loop(), self.queue_size)
+        handler.scheduler = folder_queue
+
+        self.queues[handler] = folder_queue
+        self.tasks[handler] = asyncio.create_task(
+            self.sort_folder(handler, folder_queue)
+        )
+
+    async def remove(self, handler) -> None:
+        """Sorts the pending events of handler's folder, then stops its task,
+        leaving the other folders running."""
+
+        folder_queue = self.queues.pop(handler)
+        await folder_queue.queue.put(STOP)
+        await self.tasks.pop(handler)
+
+    def reconcile(self) -> None:
+        """Queues a full sort of every folder."""
+
+        for folder_queue in self.queues.values():
+            folder_queue.put(RECONCILE)
+
+    async def next_batch(self, folder_queue: FolderQueue):
+        """Waits for the next burst of events and returns (paths, received,
+        reconcile, stop), where received is True if any event arrived,
+        reconcile is True if a full sort is needed and stop is True if the
+        runtime is shutting down."""
+
+        loop = asyncio.get_running_loop()
+        queue = folder_queue.queue
+
+        batch: dict = {}
+        received = reconcile = stop = False
+
+        item = await queue.get()
+        deadline = loop.time() + self.max_latency
+
+        while True:
+            if item is STOP:
+                stop = True
+                break
+            elif item is RECONCILE:
+                reconcile = True
+            else:
+                received = True
+                if item is not None:
+                    batch[item] = None
+
+            timeout = min(self.quiet, deadline - loop.time())
+            if timeout <= 0:
+                break
+
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+        if folder_queue.overflowed:
+            folder_queue.overflowed = False
+            reconcile = True
+
+        return list(batch), received, reconcile, stop
+
+    async def sort_folder(self, handler, folder_queue: FolderQueue) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            paths, received, reconcile, stop = await self.next_batch(folder_queue)
+
+            if reconcile:
+                await loop.run_in_executor(self.executor, handler.reconcile)
+                folder_queue.runs += 1
+            elif received:
+                await loop.run_in_executor(self.executor, handler.sort_batch, paths)
+                folder_queue.runs += 1
+
+            if stop:
+                return
+
+    async def shutdown(self) -> None:
+        """Sorts every folder's pending events, then stops its task."""
+
+        for folder_queue in self.queues.values():
+            await folder_queue.queue.put(STOP)
+
+        await asyncio.gather(*self.tasks.values())
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,95 @@
+import threading
+import time
+
+
+class DebouncedScheduler:
+    """Coalesces bursts of events for one tracked folder into a single call.
+
+    The callback is called with the list of items collected during a burst,
+    once no new event has arrived for `quiet` seconds, or once `max_latency`
+    seconds have passed since the first event of the burst.
+    """
+
+    def __init__(self, callback, quiet: float = 0.25, max_latency: float = 2.0) -> None:
+        """
+        callback: Function called with a list of the items given to self.notify()
+
+        quiet: Seconds without new events after which a burst is considered over
+
+        max_latency: Maximum seconds an event can wait before the callback is called
+        """
+
+        self.callback = callback
+        self.quiet = quiet
+        self.max_latency = max_latency
+
+        # Stats
+        self.events_received = 0
+        self.runs = 0
+
+        # dict instead of set so items are handled in the order they arrived
+        self.pending: dict = {}
+        self.first_event = None
+        self.last_event = None
+        self.flushing = False
+        self.worker = None
+
+        self.condition = threading.Condition()
+        # Makes sure the callback is never running twice at the same time
+        self.run_lock = threading.Lock()
+
+    def notify(self, item=None) -> None:
+        """Registers an event, starting a new burst if there is none pending."""
+
+        with self.condition:
+            now = time.monotonic()
+
+            self.events_received += 1
+            if item is not None:
+                self.pending[item] = None
+            self.last_event = now
+
+            if self.first_event is None:
+                self.first_event = now
+
+                # Worker thread only lives for the length of a burst, so idle
+                # folders don't cost a thread each
+                self.worker = threading.Thread(target=self.wait_and_run, daemon=True)
+                self.worker.start()
+
+    def wait_and_run(self) -> None:
+        """Waits for the current burst to end, then calls self.callback."""
+
+        with self.condition:
+            while not self.flushing:
+                deadline = min(
+                    self.last_event + self.quiet, self.first_event + self.max_latency
+                )
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    break
+
+                self.condition.wait(remaining)
+
+            items = list(self.pending)
+            self.pending = {}
+            self.first_event = None
+
+        with self.run_lock:
+            self.runs += 1
+            self.callback(items)
+
+    def flush(self) -> None:
+        """Runs any pending burst immediately and waits for it to finish."""
+
+        with self.condition:
+            worker = self.worker
+            self.flushing = True
+            self.condition.notify_all()
+
+        if worker is not None:
+            worker.join()
+
+        with self.condition:
+            self.flushing = False
@@ -0,0 +1,183 @@
+import os
+import stat
+import threading
+from collections import OrderedDict
+
+# If being run directly or by running sorter_test.py, assets.extensions
+# will fail so use import extensions instead
+try:
+    import assets.extensions as extensions
+except ImportError:
+    import extensions
+
+# Bytes read from the start of each file, enough for the tar header at 257
+HEADER_SIZE = 512
+
+# (offset, magic bytes, extension) of each recognised format. Formats without
+# an extension in constants.FILE_FOLDERS use one of the same kind, e.g. "mp3"
+# for any audio, so they end up in the same sorting folder
+SIGNATURES = (
+    (0, b"%PDF-", "pdf"),
+    (0, b"\x89PNG\r\n\x1a\n", "png"),
+    (0, b"\xff\xd8\xff", "jpg"),
+    (0, b"GIF87a", "gif"),
+    (0, b"GIF89a", "gif"),
+    (0, b"8BPS", "psd"),
+    (8, b"WEBP", "png"),
+    (8, b"WAVE", "wav"),
+    (8, b"AVI ", "avi"),
+    (0, b"ID3", "mp3"),
+    (0, b"fLaC", "mp3"),
+    (0, b"OggS", "mp3"),
+    (4, b"ftyp", "mp4"),
+    (0, b"\x1a\x45\xdf\xa3", "mkv"),
+    (0, b"FLV\x01", "flv"),
+    (0, b"\x00\x00\x01\xba", "mpg"),
+    (0, b"OTTO", "otf"),
+    (0, b"\x00\x01\x00\x00\x00", "ttf"),
+    (0, b"\x1f\x8b", "gz"),
+    (0, b"BZh", "gz"),
+    (0, b"\xfd7zXZ\x00", "tar.xz"),
+    (0, b"7z\xbc\xaf\x27\x1c", "7z"),
+    (0, b"Rar!\x1a\x07", "rar"),
+    (0, b"\xed\xab\xee\xdb", "rpm"),
+    (0, b"!<arch>\ndebian", "deb"),
+    (257, b"ustar", "tar"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "doc"),
+    (0, b"{\\rtf", "rtf"),
+    (0, b"SQLite format 3\x00", "dat"),
+    (0, b"\x7fELF", "bin"),
+    (0, b"MZ", "exe"),
+    (0, b"#!", "sh"),
+)
+
+# Zip files are also Office documents and Java archives, told apart by the
+# name of their first member, which starts at byte 30
+ZIP_MAGIC = (b"PK\x03\x04", b"PK\x05\x06")
+ZIP_MEMBERS = ((b"[Content_Types].xml", "docx"), (b"META-INF/", "jar"))
+
+# Marks a file which was sniffed without being recognised, as None means
+# the file isn't in the cache
+UNKNOWN = ""
+
+
+def read_header(path: str, size: int = HEADER_SIZE) -> bytes:
+    """Returns the first size bytes (or fewer) of the file at path, with a
+    single read."""
+
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+
+    try:
+        if hasattr(os, "pread"):
+            return os.pread(fd, size, 0)
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+
+def identify(header: bytes) -> str:
+    """Returns the extension of the format header (the first bytes of a file)
+    is in, or UNKNOWN if it isn't recognised.
+
+    Files which look like text (no NUL bytes and valid UTF-8) are "html" or
+    "txt", as there are no magic numbers for text.
+    """
+
+    if header.startswith(ZIP_MAGIC):
+        for member, extension in ZIP_MEMBERS:
+            if header.startswith(member, 30):
+                return extension
+        return "zip"
+
+    for offset, magic, extension in SIGNATURES:
+        if header.startswith(magic, offset):
+            return extension
+
+    if not header or b"\x00" in header:
+        return UNKNOWN
+
+    try:
+        text = header.decode("utf-8")
+    except UnicodeDecodeError as error:
+        # The header may end part way through a character
+        if error.start < len(header) - 3:
+            return UNKNOWN
+        text = header[: error.start].decode("utf-8")
+
+    start = text.lstrip().lower()
+    if start.startswith(("<!doctype html", "<html")):
+        return "html"
+    if start.startswith("<?xml"):
+        return "xml"
+
+    return "txt"
+
+
+class Sniffer:
+    """Classifies files by their first bytes (their magic number), for files
+    whose extension is missing or unknown.
+
+    Results are kept in an LRU cache keyed by each file's device, inode and
+    mtime, so a file is only read once unless it is modified.
+    """
+
+    def __init__(self, maxsize: int = 10000, index=extensions.EXTENSION_INDEX) -> None:
+        """
+        maxsize: Most files whose result is cached
+
+        index: Extension -> sorting folder, see extensions.build_extension_index()
+        """
+
+        self.maxsize = maxsize
+        self.index = index
+
+        # (device, inode, mtime) -> extension, most recently used last
+        self.cache: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Stats
+        self.reads = 0
+        self.hits = 0
+
+    def sniff(self, path: str, stat_result: os.stat_result) -> str:
+        """Returns the extension of the format of the file at path, or
+        UNKNOWN if it isn't recognised. stat_result is the file's stat."""
+
+        key = (stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns)
+
+        with self.lock:
+            extension = self.cache.get(key)
+
+            if extension is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return extension
+
+        # Read outside of the lock, so other files can be looked up meanwhile
+        extension = identify(read_header(path))
+
+        with self.lock:
+            self.reads += 1
+            self.cache[key] = extension
+
+            if len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+
+        return extension
+
+    def classify(self, entry):
+        """Returns the sorting folder for entry (an os.DirEntry or PathEntry)
+        based on its content, or None if it isn't a regular file, can't be
+        read or its format isn't recognised."""
+
+        try:
+            stat_result = entry.stat()
+
+            if not stat.S_ISREG(stat_result.st_mode):
+                return None
+
+            extension = self.sniff(entry.path, stat_result)
+        except OSError:
+            return None
+
+        return self.index.get(extension)
@@ -1,15 +1,28 @@
 import logging
 import os
-import shutil
+import stat
+import threading
 import time
-from datetime import datetime
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
 
 # If being run directly or by runnint sorter_test.py, assets.constants
 # will fail so use import constants instead
 try:
     import assets.constants as constants
+    import assets.extensions as extensions
+    import assets.logqueue as logqueue
+    from assets.executor import MoveExecutor
+    from assets.metrics import NO_TIMER
+    from assets.mover import Mover
 except ImportError:
     import constants
+    import extensions
+    import logqueue
+    from executor import MoveExecutor
+    from metrics import NO_TIMER
+    from mover import Mover
 
 # Log
 LOG_PATH = os.path.join(
@@ -26,14 +39,75 @@ formatter = logging.Formatter(
 file_handler = logging.FileHandler(LOG_PATH)
 file_handler.setFormatter(formatter)
 
-logger.addHandler(file_handler)
+# Records are written to the file from a background thread
+listener = logqueue.listen(logger, file_handler)
+
+# Journal with a line of JSON for every item moved, only written to once
+# start_journal() has been called
+journal = logging.getLogger(f"{__name__}.journal")
+journal.setLevel(logging.WARNING)
+journal.propagate = False
+
+
+def start_journal(path: str):
+    """Starts writing a line of JSON to path for every item moved, returning
+    the logqueue.Listener writing it."""
+
+    journal_handler = logging.FileHandler(path)
+    journal_handler.setFormatter(logqueue.JsonLinesFormatter())
+
+    journal.setLevel(logging.INFO)
+
+    return logqueue.listen(journal, journal_handler)
+
+
+# A single planned move, reason being why source is sorted into destination
+Move = namedtuple("Move", ["source", "destination", "reason"])
+
+
+class PathEntry:
+    """Stand in for os.DirEntry, for a single item found through a watchdog
+    event instead of os.scandir. Stat results are cached like a DirEntry's."""
+
+    __slots__ = ("name", "path", "_lstat", "_stat")
+
+    def __init__(self, folder: str, name: str) -> None:
+        self.name = name
+        self.path = os.path.join(folder, name)
+
+        self._lstat = None
+        self._stat = None
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if self._lstat is None:
+            self._lstat = os.lstat(self.path)
+
+        if not follow_symlinks or not stat.S_ISLNK(self._lstat.st_mode):
+            return self._lstat
+
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+
+        return self._stat
+
+    def is_dir(self) -> bool:
+        try:
+            return stat.S_ISDIR(self.stat().st_mode)
+        except OSError:
+            return False
 
 
 class Sorter:
     """Generates sorter objects which can sort all files in a given folder."""
 
     def __init__(
-        self, folder: str, sort_type: str, earliest_year: int = datetime.today().year
+        self,
+        folder: str,
+        sort_type: str,
+        earliest_year: int = datetime.today().year,
+        lazy_folders: bool = False,
+        move_workers: int = 1,
+        pool_per_device: bool = False,
     ) -> None:
         """
         folder: Folder that Sorter object will be sorting (absolute path must be given)
@@ -42,26 +116,133 @@ class Sorter:
 
         earliest_year: Earliest year to create folders for if 'date'
                        was given for sort_type
+
+        lazy_folders: If True, sorting folders are only created once an item
+                      is sorted into them, instead of all being created
+                      by the ensure functions
+
+        move_workers: Number of threads used to move items while sorting
+
+        pool_per_device: If True, each destination device gets its own
+                         pool of move_workers threads
         """
 
         self.folder = folder
         self.sort_type = sort_type
         self.earliest_year = earliest_year
-
-        # Used in self.sort() to call the correct functions
-        # based on sort type
+        self.lazy_folders = lazy_folders
+
+        # Sorting folders which are known to exist, so moves into
+        # them don't need to check for them first
+        self.known_folders: set = set()
+        self.folder_lock = threading.Lock()
+
+        # Moves are planned first, then run by the executor
+        self.executor = MoveExecutor(move_workers, pool_per_device)
+        self.move_errors: list = []
+
+        # Renames items when possible, copying only across devices
+        self.mover = Mover()
+        self.move_stats: dict = {}
+
+        # Optional SelfEventFilter which records every move made, so events
+        # caused by this Sorter can be ignored by the event handler
+        self.suppressor = None
+
+        # Optional PlacementIndex which records what has been sorted, so a
+        # folder left unchanged since it was last sorted can be skipped
+        self.index = None
+
+        # Optional Metrics to record the time spent in each phase of sorting,
+        # and counts of the moves made
+        self.metrics = None
+
+        # Optional Rules (see assets/rules.py), checked before the sort type
+        # so items can be moved to their own folder or left in place
+        self.rules = None
+
+        # Optional Sniffer (see assets/sniff.py), classifying files by their
+        # first bytes when sorting by file type finds no folder for their
+        # extension
+        self.sniffer = None
+
+        # Optional StabilityGate (see assets/stability.py), holding back files
+        # which are still being written until they settle
+        self.stability = None
+
+        # Validity is checked once here, then only rechecked by
+        # self.is_valid() after self.valid_until (the next midnight, as the
+        # current year is part of it) or a call to self.invalidate()
+        self.valid = False
+        self.valid_until = None
+        self.is_valid()
+
+        # Used in self.sort(), self.plan() and self.sort_entry() to call
+        # the correct functions based on sort type
         self.s_dict: dict = {
-            "file_type": [self.ensure_file_folders, self.sort_file],
-            "date": [self.ensure_date_folders, self.sort_date],
+            "file_type": [
+                self.ensure_file_folders,
+                self.sort_file,
+                self.plan_file_entry,
+                self.plan_file,
+            ],
+            "date": [
+                self.ensure_date_folders,
+                self.sort_date,
+                self.plan_date_entry,
+                self.plan_date,
+            ],
         }
 
         logger.info(
-            f"Created Sorter object for: {self.folder}"
-            f"\nSorting by: {self.sort_type}"
+            "Created Sorter object for: %s\nSorting by: %s", self.folder, self.sort_type
         )
-        logger.debug(
-            "Other attributes:" f"\nearliest year: {self.earliest_year}",
+        logger.debug("Other attributes:\nearliest year: %s", self.earliest_year)
+
+    def timer(self, phase: str):
+        """Returns a context manager timing a phase of sorting into
+        self.metrics, which does nothing if metrics are disabled."""
+
+        if self.metrics is None:
+            return NO_TIMER
+
+        return self.metrics.timer("phase_seconds", folder=self.folder, phase=phase)
+
+    def record_move_stats(self, stats: dict, errors: int = 0) -> None:
+        """Adds stats returned by self.mover.reset_stats() to self.metrics."""
+
+        if self.metrics is None:
+            return
+
+        for kind in ("renames", "copies"):
+            self.metrics.inc("moves_total", stats[kind], folder=self.folder, kind=kind)
+
+        self.metrics.inc(
+            "bytes_copied_total", stats["bytes_copied"], folder=self.folder
         )
+        self.metrics.inc("move_errors_total", errors, folder=self.folder)
+
+    def is_valid(self) -> bool:
+        """Returns whether the provided constructor arguments are valid, like
+        self.assert_valid(), but reusing the last result while it is known
+        to still hold. Invalid results are never reused."""
+
+        if self.valid_until is None or time.time() >= self.valid_until:
+            self.valid = self.assert_valid()
+
+            if self.valid:
+                tomorrow = self.today.date() + timedelta(days=1)
+                self.valid_until = datetime(*tomorrow.timetuple()[:3]).timestamp()
+            else:
+                self.valid_until = None
+
+        return self.valid
+
+    def invalidate(self) -> None:
+        """Makes the next call of self.is_valid() check validity again, e.g.
+        after the folder has been deleted or moved."""
+
+        self.valid_until = None
 
     def assert_valid(self) -> bool:
         """Returns whether the provided constructor arguments are valid."""
@@ -84,9 +265,17 @@ class Sorter:
         return self.is_valid_folder and self.is_valid_sort and self.is_valid_earliest
 
     def update_dir_files(self) -> None:
-        """Updates the list of files/folders present in self.folder."""
+        """Updates the list of files/folders present in self.folder.
+
+        self.dir_entries holds the os.DirEntry for each item, which carries
+        its type and caches its stat result, so sorting needs no extra
+        syscalls to check whether an item is a folder.
+        """
 
-        self.dir_files: list = os.listdir(self.folder)
+        with self.timer("list"), os.scandir(self.folder) as entries:
+            self.dir_entries: list = list(entries)
+
+        self.dir_files: list = [entry.name for entry in self.dir_entries]
 
     def update_years(self) -> None:
         """Update the list of years that folders are to be generated for.
@@ -98,11 +287,71 @@ class Sorter:
             map(str, list(range(self.earliest_year, datetime.today().year + 1)))
         )
 
+        self.update_month_starts()
+
+    def update_month_starts(self) -> None:
+        """Updates the epoch times (local time) at which each month in
+        self.years begins, ending with the start of the year after the last.
+
+        Used to place modification times in their year and month folder with
+        a binary search, instead of formatting and parsing a date string.
+        Only recalculated when self.years changes.
+        """
+
+        if getattr(self, "month_starts_years", None) == self.years:
+            return
+
+        self.month_starts_years: list = self.years
+        self.month_starts: list = [
+            time.mktime((int(year), month, 1, 0, 0, 0, 0, 0, -1))
+            for year in self.years
+            for month in range(1, 13)
+        ]
+        self.month_starts.append(
+            time.mktime((int(self.years[-1]) + 1, 1, 1, 0, 0, 0, 0, 0, -1))
+        )
+
+    def bucket_mtimes(self, mtimes) -> list:
+        """Returns the (year, month folder) each modification time in mtimes
+        (seconds since the epoch) is sorted into, or None for times before
+        self.earliest_year or after the end of the current year.
+
+        Sorting a whole batch in one call avoids the per call overhead when
+        backfilling large folders. self.update_years() must have been called.
+        """
+
+        starts = self.month_starts
+        last = len(starts) - 1
+        years = self.years
+        month_folders = constants.MONTH_FOLDERS
+
+        buckets = []
+        for mtime in mtimes:
+            index = bisect_right(starts, mtime) - 1
+
+            # Times after the current year (e.g. from a wrong clock) have no
+            # year folder, which would otherwise be sorted as an item itself
+            if 0 <= index < last:
+                buckets.append((years[index // 12], month_folders[index % 12]))
+            else:
+                buckets.append(None)
+
+        return buckets
+
+    def bucket_mtime(self, mtime: float):
+        """Returns the (year, month folder) a single modification time is
+        sorted into. See self.bucket_mtimes()."""
+
+        return self.bucket_mtimes((mtime,))[0]
+
     def ensure_file_folders(self) -> None:
         """Ensures sorting folders for file types are present in self.folder."""
 
         self.update_dir_files()
 
+        if self.lazy_folders:
+            return
+
         for file_type in constants.FILE_FOLDERS:
             if file_type not in self.dir_files:
                 os.mkdir(os.path.join(self.folder, file_type))
@@ -119,117 +368,469 @@ class Sorter:
         self.update_dir_files()
         self.update_years()
 
+        if self.lazy_folders:
+            return
+
         for year in self.years:
             if year not in self.dir_files:
                 os.mkdir(os.path.join(self.folder, year))
 
-                for month in constants.MONTHS:
-                    os.mkdir(
-                        os.path.join(
-                            self.folder, year, f"{constants.MONTHS[month]} {month}"
-                        )
-                    )
+                for month_folder in constants.MONTH_FOLDERS:
+                    os.mkdir(os.path.join(self.folder, year, month_folder))
 
-    def sort_file(self):
-        """Sorts self.folder by file type."""
+    def generated_folders(self) -> set:
+        """Returns the names of the sorting folders generated in self.folder,
+        which should never be sorted themselves."""
 
-        self.update_dir_files()
+        if self.sort_type == "date":
+            self.update_years()
+            generated = set(self.years)
+        else:
+            generated = set(constants.FILE_FOLDERS)
 
-        for item in self.dir_files:
-            # Don't sort the generated sort folders
-            if item in constants.FILE_FOLDERS:
-                continue
+        if self.rules is not None:
+            generated |= self.rules.folders
+
+        return generated
+
+    def is_settling(self, entry) -> bool:
+        """Returns whether entry is still being written, so must not be moved
+        yet. self.stability queues it to be sorted once it has settled."""
+
+        return self.stability is not None and not self.stability.admit(entry)
+
+    def holding(self) -> bool:
+        """Returns whether any item of self.folder is being held back by
+        self.stability, or was left unsorted when it was cleared, so the
+        folder isn't fully sorted."""
+
+        return self.stability is not None and (
+            bool(self.stability.held) or self.stability.dropped
+        )
+
+    def plan_rule_entry(self, entry):
+        """Returns (matched, move) for entry, matched being whether any of
+        self.rules matched it. move is None for rules leaving it in place."""
+
+        if self.rules is None:
+            return False, None
+
+        rule = self.rules.match(entry)
+
+        if rule is None:
+            return False, None
+
+        if rule.folder is None:
+            # Ages change without the item changing, so items left in place
+            # because of their age must be checked again next time
+            if self.index is not None and rule.kind != "age":
+                self.index.keep(entry)
+            return True, None
+
+        destination = os.path.join(self.folder, *rule.folder.split("/"), entry.name)
+
+        return True, Move(entry.path, destination, f"rule on line {rule.line}")
+
+    def plan_file_entry(self, entry):
+        """Returns the Move for entry (an os.DirEntry or PathEntry in
+        self.folder) when sorting by file type, or None if a rule leaves
+        it in place."""
+
+        matched, move = self.plan_rule_entry(entry)
+        if matched:
+            return move
+
+        item = entry.name
+
+        if entry.is_dir():
+            file_type, reason = "Folders & Archives", "folder"
+        else:
+            file_type, reason = extensions.lookup(item), "extension"
+
+            if file_type is None and self.sniffer is not None:
+                file_type, reason = self.sniffer.classify(entry), "content"
+
+            if file_type is None:
+                file_type, reason = "Other", "unknown extension"
+
+        return Move(entry.path, os.path.join(self.folder, file_type, item), reason)
+
+    def plan_date_entry(self, entry):
+        """Returns the Move for entry (an os.DirEntry or PathEntry in
+        self.folder) when sorting by date, or None if it was modified
+        before self.earliest_year or a rule leaves it in place."""
+
+        matched, move = self.plan_rule_entry(entry)
+        if matched:
+            return move
 
-            old_path = os.path.join(self.folder, item)
+        bucket = self.bucket_mtime(entry.stat().st_mtime)
 
-            if os.path.isdir(old_path):
-                new_path = os.path.join(self.folder, "Folders & Archives", item)
+        if bucket is None:
+            self.skip_too_early(entry)
+            return None
 
+        return Move(entry.path, os.path.join(self.folder, *bucket, entry.name), "mtime")
+
+    def log_too_early(self, entry) -> None:
+        """Logs that entry was skipped as it is older than self.earliest_year."""
+
+        logger.warning(
+            "\n%s was last modified %s"
+            "\nThis is earlier than the earliest given year of "
+            "%s, so the file was skipped while sorting.",
+            entry.name,
+            time.ctime(entry.stat().st_mtime),
+            self.earliest_year,
+        )
+
+    def skip_too_early(self, entry) -> None:
+        """Leaves entry in place as it is older than self.earliest_year, or
+        was modified after the end of the current year.
+
+        It is only logged the first time if self.index has been set, as the
+        index remembers it was left in place until it is modified. Items from
+        the future are logged every time, as they can be sorted once their
+        year comes.
+        """
+
+        if entry.stat().st_mtime >= self.month_starts[-1]:
+            logger.warning(
+                "\n%s was last modified %s"
+                "\nThis is after the current year, so the file was skipped "
+                "while sorting.",
+                entry.name,
+                time.ctime(entry.stat().st_mtime),
+            )
+        elif self.index is None:
+            self.log_too_early(entry)
+        elif not self.index.is_kept(entry):
+            self.log_too_early(entry)
+            self.index.keep(entry)
+
+    def ensure_folder(self, folder: str) -> None:
+        """Ensures the sorting folder an item is about to be moved into exists.
+
+        Folders are only checked the first time they are used, after which
+        they are remembered in self.known_folders.
+        """
+
+        if folder in self.known_folders:
+            return
+
+        with self.folder_lock:
+            if self.lazy_folders:
+                os.makedirs(folder, exist_ok=True)
+
+            # Folders may be missing if the year has changed since the last
+            # full sort, or if they were deleted by the user
+            elif not os.path.isdir(folder):
+                self.s_dict[self.sort_type][0]()
+                os.makedirs(folder, exist_ok=True)
+
+            self.known_folders.add(folder)
+
+    def move(self, old_path: str, new_path: str) -> None:
+        """Moves an item to its sorted location, recording the move first
+        if self.suppressor has been set."""
+
+        logger.info("Moving %s to %s", old_path, new_path)
+
+        folder = os.path.dirname(new_path)
+        self.ensure_folder(folder)
+
+        if self.suppressor is not None:
+            self.suppressor.record(old_path, new_path)
+
+        try:
+            if self.metrics is None:
+                self.mover.move(old_path, new_path)
             else:
-                extension = os.path.splitext(item)[-1][1:]
+                with self.metrics.timer("move_seconds", folder=self.folder):
+                    self.mover.move(old_path, new_path)
+        except FileNotFoundError:
+            if not os.path.lexists(old_path):
+                raise
+
+            # Sorting folder was removed since it was last used
+            self.known_folders.discard(folder)
+            self.mover.devices.pop(folder, None)
+            self.ensure_folder(folder)
+            self.mover.move(old_path, new_path)
+
+        if journal.isEnabledFor(logging.INFO):
+            journal.info(
+                "Moved %s to %s",
+                old_path,
+                new_path,
+                extra={
+                    "fields": {
+                        "folder": self.folder,
+                        "source": old_path,
+                        "destination": new_path,
+                    }
+                },
+            )
 
-                for file_type in constants.FILE_FOLDERS:
-                    if extension in constants.FILE_FOLDERS[file_type]:
-                        new_path = os.path.join(self.folder, file_type, item)
-                        break
-                else:
-                    new_path = os.path.join(self.folder, "Other", item)
+    def plan_file(self, rescan: bool = True) -> list:
+        """Returns the list of Moves needed to sort self.folder by file type,
+        without moving anything.
 
-            logger.info(f"Moving {old_path} to {new_path}")
+        rescan: If False, the items found by the last call of
+                self.update_dir_files() are planned instead of listing the
+                folder again
+        """
 
-            shutil.move(old_path, new_path)
+        if rescan:
+            self.update_dir_files()
 
-    def sort_date(self):
-        """Sorts self.folder by date of last modification."""
+        generated = self.generated_folders()
 
-        self.update_dir_files()
+        plan = []
+        for entry in self.dir_entries:
+            # Don't sort the generated sort folders, or files being written
+            if entry.name in generated or self.is_settling(entry):
+                continue
+
+            move = self.plan_file_entry(entry)
+            if move is not None:
+                plan.append(move)
+
+        return plan
+
+    def plan_date(self, rescan: bool = True) -> list:
+        """Returns the list of Moves needed to sort self.folder by date of
+        last modification, without moving anything.
+
+        rescan: If False, the items found by the last call of
+                self.update_dir_files() are planned instead of listing the
+                folder again
+        """
 
-        for item in self.dir_files:
-            # Don't sort the generated sort folders
-            if item in self.years:
+        if rescan:
+            self.update_dir_files()
+        generated = self.generated_folders()
+
+        plan = []
+        entries = []
+        mtimes = []
+        for entry in self.dir_entries:
+            # Don't sort the generated sort folders, or files being written
+            if entry.name in generated or self.is_settling(entry):
                 continue
 
-            old_path = os.path.join(self.folder, item)
+            matched, move = self.plan_rule_entry(entry)
+            if matched:
+                if move is not None:
+                    plan.append(move)
+                continue
 
-            # Time since modification to file/folder in seconds are
-            # converted to local time when file was modified
-            mod_seconds = os.path.getmtime(old_path)
-            mod_local_time = time.ctime(mod_seconds).split()
+            # Items removed since the folder was listed are skipped
+            try:
+                mtimes.append(entry.stat().st_mtime)
+            except FileNotFoundError:
+                continue
 
-            mod_month = mod_local_time[1]
-            mod_year = mod_local_time[-1]
+            entries.append(entry)
 
-            if int(mod_year) < self.earliest_year:
-                logger.warning(
-                    f"\n{item} was last modified {mod_local_time}"
-                    "\nThis is earlier than the earliest given year of "
-                    f"{self.earliest}, so the file was skipped while sorting."
-                )
+        for entry, bucket in zip(entries, self.bucket_mtimes(mtimes)):
+            if bucket is None:
+                self.skip_too_early(entry)
                 continue
 
-            new_path = os.path.join(
-                self.folder,
-                mod_year,
-                f"{constants.MONTHS[mod_month]} {mod_month}",
-                item,
+            new_path = os.path.join(self.folder, *bucket, entry.name)
+            plan.append(Move(entry.path, new_path, "mtime"))
+
+        return plan
+
+    def plan(self, rescan: bool = True) -> list:
+        """Returns the list of Moves needed to sort self.folder based on
+        self.sort_type, without moving anything or creating any folders."""
+
+        return self.s_dict[self.sort_type][3](rescan)
+
+    def apply(self, plan: list) -> None:
+        """Runs the Moves in plan with self.executor.
+
+        Items which fail to move are logged and kept in self.move_errors,
+        without stopping the rest from being moved. Counts of renames, copies
+        and bytes copied are kept in self.move_stats.
+        """
+
+        self.mover.reset_stats()
+        with self.timer("move"):
+            self.move_errors = self.executor.run(self.move, plan)
+        self.move_stats = self.mover.reset_stats()
+        self.record_move_stats(self.move_stats, len(self.move_errors))
+
+        logger.info("Moves for %s: %s", self.folder, self.move_stats)
+
+        if self.index is not None:
+            failed = {old_path for old_path, _, _ in self.move_errors}
+            self.index.record_placements(
+                [move for move in plan if move[0] not in failed]
+            )
+
+        for old_path, new_path, error in self.move_errors:
+            logger.error(
+                "\nCould not move %s to %s\n%s: %s",
+                old_path,
+                new_path,
+                type(error).__name__,
+                error,
             )
 
-            logger.info(f"Moving {old_path} to {new_path}")
+    def sort_file(self, rescan: bool = True):
+        """Sorts self.folder by file type.
 
-            shutil.move(old_path, new_path)
+        rescan: If False, the items found by the last call of
+                self.update_dir_files() are sorted instead of listing the
+                folder again
+        """
+
+        self.apply(self.plan_file(rescan))
+
+    def sort_date(self, rescan: bool = True):
+        """Sorts self.folder by date of last modification.
+
+        rescan: If False, the items found by the last call of
+                self.update_dir_files() are sorted instead of listing the
+                folder again
+        """
 
-    def sort(self):
-        """Calls appropriate sort function (file or date) based on self.sort_type"""
+        self.apply(self.plan_date(rescan))
 
+    def sort_entry(self, item: str) -> bool:
+        """Sorts a single item directly inside self.folder, without listing
+        or sorting the rest of the folder.
+
+        Used for incremental sorting, as a full sort is only needed at startup
+        or when reconciling. Returns True if the item was moved.
+        """
+
+        # Don't sort the generated sort folders
+        if item in self.generated_folders():
+            return False
+
+        entry = PathEntry(self.folder, item)
+
+        # Item may have already been moved or deleted by the time
+        # the event is handled
         try:
-            if self.assert_valid():
-                # Executes respective ensure function then
-                # respective sort function
-                self.s_dict[self.sort_type][0]()
-                self.s_dict[self.sort_type][1]()
+            entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            return False
+
+        if self.is_settling(entry):
+            return False
+
+        with self.timer("classify"):
+            move = self.s_dict[self.sort_type][2](entry)
+
+        if move is None:
+            return False
+
+        self.move(move.source, move.destination)
+
+        if self.metrics is not None:
+            self.record_move_stats(self.mover.reset_stats())
+
+        if self.index is not None:
+            self.index.record_placements([move])
+
+        return True
+
+    def sort(self, skip_unchanged: bool = False):
+        """Calls appropriate sort function (file or date) based on self.sort_type
+
+        skip_unchanged: If True and self.index shows the folder has not changed
+                        since it was last fully sorted, only the sorting
+                        folders are ensured, without planning any moves.
+                        If it has changed, only the items missing from the
+                        index's snapshot are sorted
+        """
+
+        try:
+            with self.timer("validate"):
+                valid = self.is_valid()
+
+            if valid:
+                # Checked before ensuring, as creating folders changes the mtime
+                unchanged = (
+                    skip_unchanged
+                    and self.index is not None
+                    and self.index.unchanged()
+                )
+
+                # Taken before listing the folder, so an item added while
+                # sorting isn't recorded as sorted. The sort's own moves also
+                # change the folder, so it is listed once more next time
+                if self.index is not None:
+                    signature = self.index.signature()
+
+                # Executes respective ensure function, then plans and applies
+                # the moves, reusing the listing made by the ensure function
+                with self.timer("ensure"):
+                    self.s_dict[self.sort_type][0]()
+
+                if unchanged:
+                    logger.info("%s unchanged since last sort, skipping", self.folder)
+                    self.move_errors = []
+                else:
+                    if skip_unchanged and self.index is not None:
+                        # Only the items added or modified since the index's
+                        # snapshot was taken need sorting
+                        self.dir_entries = self.index.delta(self.dir_entries)
+
+                    with self.timer("classify"):
+                        plan = self.plan(rescan=False)
+
+                    self.apply(plan)
+
+                # Held items still need sorting, so the folder isn't sorted
+                if (
+                    self.index is not None
+                    and not self.move_errors
+                    and not self.holding()
+                ):
+                    self.index.mark_sorted(signature)
+
+                if self.metrics is not None:
+                    self.metrics.inc("sorts_total", folder=self.folder)
             else:
                 raise IOError
         except IOError:
+            # Folder may have been removed, so check again when logging
+            self.invalidate()
+
             print(
                 f"\nThere was an error while sorting files by {self.sort_type}:"
                 "\nPlease check the log file for further information"
             )
 
             logger.exception(
-                f"Error while sorting by {self.sort_type}"
-                f"Sorter is valid: {self.assert_valid()}"
-                f"\nCheck the following attributes of sorter object {self}"
-                f"\nFolder valid: {self.is_valid_folder}"
-                f"\nSort type valid: {self.is_valid_sort}"
-                f"\nEarliest year valid: {self.is_valid_earliest}"
+                "Error while sorting by %s"
+                "Sorter is valid: %s"
+                "\nCheck the following attributes of sorter object %s"
+                "\nFolder valid: %s"
+                "\nSort type valid: %s"
+                "\nEarliest year valid: %s"
                 "\nAlso make sure that the current folder is not being changed by"
-                f"\nanother program. Current folder: {self.folder}"
+                "\nanother program. Current folder: %s",
+                self.sort_type,
+                self.is_valid(),
+                self,
+                self.is_valid_folder,
+                self.is_valid_sort,
+                self.is_valid_earliest,
+                self.folder,
             )
 
             logger.debug(
-                f"Other sorter object {self} attributes:"
-                f"\nearliest_year = {self.earliest_year}"
-                f"\ntoday = {self.today}"
+                "Other sorter object %s attributes:\nearliest_year = %s\ntoday = %s",
+                self,
+                self.earliest_year,
+                self.today,
             )
 
             return False
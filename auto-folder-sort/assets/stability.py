@@ -0,0 +1,294 @@
+import math
+import os
+import stat
+import threading
+import time
+
+# Suffixes browsers and download managers give files while downloading them.
+# Such files are renamed once complete, so they are never sorted themselves
+PARTIAL_SUFFIXES = (".part", ".crdownload", ".download", ".partial")
+
+# Most IN_CLOSE_WRITE results remembered for items not yet sorted
+CLOSED_LIMIT = 4096
+
+
+def is_partial(name: str) -> bool:
+    """Returns whether name is that of a download still in progress."""
+
+    return name.lower().endswith(PARTIAL_SUFFIXES)
+
+
+class TimerWheel:
+    """Calls callbacks after a delay, rounded up to a number of ticks, from a
+    single thread for any number of timers.
+
+    Timers are kept in a ring of slots, one per tick. Scheduling or cancelling
+    one is a dict operation, and each tick only looks at the timers of one
+    slot, however many there are in total. Timers further away than a full
+    turn of the ring wait for as many extra turns as needed. The thread waits
+    without waking up while there are no timers.
+    """
+
+    def __init__(self, tick: float = 0.05, slots: int = 512) -> None:
+        """
+        tick: Seconds between each slot, the precision of the delays
+
+        slots: Number of slots in the ring
+        """
+
+        self.tick = tick
+
+        # Each slot maps the key of each of its timers to [turns, callback],
+        # turns being the number of times the slot is passed before it fires
+        self.slots = [{} for _ in range(slots)]
+        self.current = 0
+        self.next_tick = None
+
+        # Key -> index of the slot holding it
+        self.timers: dict = {}
+
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def schedule(self, key, delay: float, callback) -> None:
+        """Calls callback() in delay seconds, replacing any timer with the
+        same key."""
+
+        ticks = max(1, math.ceil(delay / self.tick))
+
+        with self.condition:
+            self.remove(key)
+
+            if not self.timers:
+                # Thread has been idle, so the ring starts turning from now
+                self.next_tick = time.monotonic() + self.tick
+
+            slot = (self.current + ticks) % len(self.slots)
+            self.slots[slot][key] = [(ticks - 1) // len(self.slots), callback]
+            self.timers[key] = slot
+
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+            self.condition.notify()
+
+    def cancel(self, key) -> None:
+        with self.condition:
+            self.remove(key)
+
+    def remove(self, key) -> None:
+        slot = self.timers.pop(key, None)
+
+        if slot is not None:
+            del self.slots[slot][key]
+
+    def advance(self) -> list:
+        """Moves to the next slot, returning the callbacks of the timers
+        which are due. Must be called with self.condition held."""
+
+        self.current = (self.current + 1) % len(self.slots)
+        self.next_tick += self.tick
+
+        slot = self.slots[self.current]
+        due = []
+
+        for key, timer in list(slot.items()):
+            if timer[0]:
+                timer[0] -= 1
+                continue
+
+            del slot[key]
+            del self.timers[key]
+            due.append(timer[1])
+
+        return due
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.timers:
+                    self.condition.wait()
+
+                remaining = self.next_tick - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+
+                due = self.advance()
+
+            for callback in due:
+                callback()
+
+
+class StabilityGate:
+    """Holds back items of a tracked folder which are still being written,
+    until their size and mtime have not changed for `quiet` seconds, or until
+    the file is closed after writing (IN_CLOSE_WRITE, only reported by the
+    inotify backend).
+
+    Held items are checked again by a TimerWheel rather than polled. Once an
+    item is stable, callback is called with its path, e.g. to queue it to be
+    sorted, which asks self.admit() again and is let through.
+    """
+
+    def __init__(self, callback, quiet: float, wheel: TimerWheel) -> None:
+        self.callback = callback
+        self.quiet = quiet
+        self.wheel = wheel
+
+        # Path -> ((size, mtime), time it was first seen with them)
+        self.held: dict = {}
+
+        # Path -> (size, mtime) of items closed after writing, which can be
+        # sorted as long as they haven't changed since
+        self.closed: dict = {}
+
+        self.lock = threading.Lock()
+
+        # Set by self.clear(), after which nothing more is held. dropped is
+        # set if any item was left unsorted because of it
+        self.stopped = False
+        self.dropped = False
+
+        # Stats
+        self.holds = 0
+        self.releases = 0
+
+    @staticmethod
+    def key(stat_result: os.stat_result) -> tuple:
+        return stat_result.st_size, stat_result.st_mtime_ns
+
+    def admit(self, entry) -> bool:
+        """Returns whether entry (an os.DirEntry or PathEntry) can be moved
+        now. If it was modified less than self.quiet seconds ago it is held,
+        and False is returned. Partial downloads are never admitted."""
+
+        # Kept in self.closed, as it is closed before being renamed once done
+        if is_partial(entry.name):
+            return False
+
+        try:
+            stat_result = entry.stat(follow_symlinks=False)
+        except OSError:
+            # Left for the move to report
+            return True
+
+        # Only files are written to
+        if not stat.S_ISREG(stat_result.st_mode):
+            return True
+
+        key = self.key(stat_result)
+        now = time.time()
+
+        with self.lock:
+            if self.closed.pop(entry.path, None) == key:
+                return True
+
+            if entry.path in self.held:
+                return False
+
+            # When it was last written to. ctime also changes when a copy sets
+            # the mtime back to the original's, and neither can be in the future
+            since = min(now, max(stat_result.st_mtime, stat_result.st_ctime))
+            if now - since >= self.quiet:
+                return True
+
+            if self.stopped:
+                self.dropped = True
+                return False
+
+            self.held[entry.path] = (key, since)
+            self.holds += 1
+
+        self.schedule(entry.path, self.quiet - (now - since))
+
+        return False
+
+    def schedule(self, path: str, delay: float) -> None:
+        self.wheel.schedule((self, path), delay, lambda: self.check(path))
+
+    def check(self, path: str) -> None:
+        """Called by self.wheel for a held item, releasing it if it hasn't
+        changed for self.quiet seconds or holding it again if it has."""
+
+        try:
+            stat_result = os.lstat(path)
+        except OSError:
+            with self.lock:
+                self.held.pop(path, None)
+            return
+
+        key = self.key(stat_result)
+        now = time.time()
+
+        with self.lock:
+            held = self.held.get(path)
+            if held is None:
+                return
+
+            if held[0] != key:
+                self.held[path] = (key, now)
+                since = now
+            elif now - held[1] >= self.quiet:
+                del self.held[path]
+                since = None
+            else:
+                since = held[1]
+
+        if since is None:
+            self.release(path)
+        else:
+            self.schedule(path, self.quiet - (now - since))
+
+    def release(self, path: str) -> None:
+        self.releases += 1
+        self.callback(path)
+
+    def closed_write(self, path: str) -> None:
+        """Called when the file at path was closed after being written to,
+        releasing it straight away if it is held."""
+
+        try:
+            key = self.key(os.lstat(path))
+        except OSError:
+            return
+
+        with self.lock:
+            self.closed[path] = key
+            if len(self.closed) > CLOSED_LIMIT:
+                del self.closed[next(iter(self.closed))]
+
+            held = self.held.pop(path, None)
+
+        if held is not None:
+            self.wheel.cancel((self, path))
+            self.release(path)
+
+    def renamed(self, old_path: str, new_path: str) -> None:
+        """Called when an item was renamed, e.g. a finished download losing
+        its partial suffix, so it keeps its IN_CLOSE_WRITE."""
+
+        with self.lock:
+            key = self.closed.pop(old_path, None)
+            if key is not None:
+                self.closed[new_path] = key
+
+    def clear(self) -> None:
+        """Stops holding every item, e.g. when the folder stops being watched.
+        Items still being written are no longer admitted or held after this,
+        and are sorted by the next full sort instead."""
+
+        with self.lock:
+            paths = list(self.held)
+            self.held = {}
+            self.closed = {}
+
+            self.stopped = True
+            self.dropped = self.dropped or bool(paths)
+
+        for path in paths:
+            self.wheel.cancel((self, path))
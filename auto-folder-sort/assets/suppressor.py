@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from collections import Counter
+
+
+class SelfEventFilter:
+    """Remembers the moves made by a Sorter, so the watchdog events caused by
+    those moves can be dropped instead of triggering another sort."""
+
+    def __init__(self, ttl: float = 2.0) -> None:
+        """
+        ttl: Seconds for which events matching a recorded move are suppressed
+        """
+
+        self.ttl = ttl
+
+        # Number of events which have been dropped
+        self.suppressed = 0
+
+        # Moved items (and anything inside them) and the folders they were
+        # moved into. These are never sorted, so any event on them is ours
+        self.targets: dict = {}
+
+        # Moved folders, as a move of a folder also generates events for
+        # everything that was inside of it
+        self.sources: dict = {}
+
+        # The source path and source folder of a move can also be changed by
+        # the user, so only as many events as moves recorded are dropped
+        self.counts: Counter = Counter()
+        self.count_expiry: dict = {}
+
+        self.lock = threading.Lock()
+
+    def record(self, old_path: str, new_path: str) -> None:
+        """Records a move the Sorter is about to make."""
+
+        old_path = os.path.normpath(old_path)
+        new_path = os.path.normpath(new_path)
+        expires = time.monotonic() + self.ttl
+
+        with self.lock:
+            self.prune()
+
+            self.targets[new_path] = expires
+            self.targets[os.path.dirname(new_path)] = expires
+            self.sources[old_path] = expires
+
+            for path in (old_path, os.path.dirname(old_path)):
+                self.counts[path] += 1
+                self.count_expiry[path] = expires
+
+    def prune(self) -> None:
+        """Forgets recorded moves which have expired. Lock must be held."""
+
+        now = time.monotonic()
+
+        for paths in (self.targets, self.sources):
+            for path in [path for path, expiry in paths.items() if expiry < now]:
+                del paths[path]
+
+        for path in [p for p, expiry in self.count_expiry.items() if expiry < now]:
+            del self.count_expiry[path]
+            del self.counts[path]
+
+    def is_target(self, path: str, now: float) -> bool:
+        """Returns whether path is, or is inside of, a recorded move target,
+        or is inside of a recorded move source."""
+
+        if self.targets.get(path, 0) >= now:
+            return True
+
+        while True:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return False
+            path = parent
+
+            if self.targets.get(path, 0) >= now or self.sources.get(path, 0) >= now:
+                return True
+
+    def is_own(self, event) -> bool:
+        """Returns whether the given watchdog event was caused by a recorded
+        move, in which case it is counted in self.suppressed."""
+
+        paths = [os.path.normpath(event.src_path)]
+        if getattr(event, "dest_path", None):
+            paths.append(os.path.normpath(event.dest_path))
+
+        now = time.monotonic()
+
+        with self.lock:
+            if not self.targets and not self.counts:
+                return False
+
+            counted = []
+            for path in paths:
+                if self.is_target(path, now):
+                    continue
+                if self.counts[path] > 0 and self.count_expiry[path] >= now:
+                    counted.append(path)
+                    continue
+                return False
+
+            for path in counted:
+                self.counts[path] -= 1
+
+            self.suppressed += 1
+
+        return True
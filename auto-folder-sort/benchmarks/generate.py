@@ -0,0 +1,96 @@
+"""Generates synthetic tracked folders for the benchmarks."""
+
+import os
+import random
+import time
+
+# Extension -> relative weight, roughly what a downloads folder looks like.
+# "" means no extension, and "xyz" isn't in any sorting folder
+DEFAULT_EXTENSIONS = {
+    "pdf": 20,
+    "jpg": 15,
+    "png": 10,
+    "txt": 10,
+    "zip": 8,
+    "tar.gz": 2,
+    "mp3": 5,
+    "mp4": 5,
+    "docx": 8,
+    "exe": 3,
+    "py": 4,
+    "xyz": 5,
+    "": 5,
+}
+
+# Seconds in a (non leap) year
+YEAR = 365 * 24 * 60 * 60
+
+
+def mtime_range(years: int = 5, end: float = None) -> tuple:
+    """Returns the (start, end) epoch times of the last `years` years."""
+
+    end = time.time() if end is None else end
+
+    return end - years * YEAR, end
+
+
+def generate(
+    folder: str,
+    entries: int = 1000,
+    extensions: dict = None,
+    mtimes: tuple = None,
+    distribution: str = "uniform",
+    subfolder_ratio: float = 0.1,
+    prefix: str = "item",
+    seed: int = 0,
+) -> list:
+    """Fills folder with empty files and folders, returning their names.
+
+    entries: Number of items to create
+
+    extensions: Extension -> relative weight of the files created
+                (DEFAULT_EXTENSIONS if not given)
+
+    mtimes: (start, end) epoch times the items are modified between, or None
+            to leave them modified now
+
+    distribution: "uniform" to spread modification times evenly between
+                  start and end, or "recent" to skew them towards end
+
+    subfolder_ratio: Fraction of the items which are folders instead of files
+
+    prefix: Start of every item's name, so several batches of items can be
+            generated in the same folder
+
+    seed: Seed for the random choices, so the same folder is generated each time
+    """
+
+    extensions = DEFAULT_EXTENSIONS if extensions is None else extensions
+    rng = random.Random(seed)
+
+    choices = rng.choices(list(extensions), list(extensions.values()), k=entries)
+
+    names = []
+    for i, extension in enumerate(choices):
+        if rng.random() < subfolder_ratio:
+            name = f"{prefix}{i}"
+            os.mkdir(os.path.join(folder, name))
+        else:
+            name = f"{prefix}{i}.{extension}" if extension else f"{prefix}{i}"
+            with open(os.path.join(folder, name), "w"):
+                pass
+
+        if mtimes is not None:
+            start, end = mtimes
+
+            if distribution == "recent":
+                # Most items modified recently, with a long tail of older ones
+                mtime = end - min(rng.expovariate(4 / (end - start or 1)), end - start)
+            else:
+                mtime = rng.uniform(start, end)
+
+            os.utime(os.path.join(folder, name), (mtime, mtime))
+
+        names.append(name)
+
+    return names
@@ -0,0 +1,143 @@
+"""Measures how many items per second are classified by a compiled set of
+sort rules, against the number of rules, compared with checking each rule in
+turn.
+
+Note that to run this benchmark, you must execute:
+`python3 -m benchmarks.rules_bench [number of items] [rule counts...]`
+from the main directory (where main.py is)
+
+The rules are a mix of extension globs, other globs, regexes, sizes and ages,
+most of which match nothing, as in a long rules file. Every item is stat'ed
+before timing, so only classifying is measured, not the filesystem.
+"""
+
+import argparse
+import fnmatch
+import os
+import random
+import re
+import tempfile
+import time
+
+from assets.rules import AGE_UNITS, SIZE_UNITS, Rules, parse_interval, parse_rule
+from benchmarks.generate import generate, mtime_range
+
+
+def make_rules(count: int, seed: int = 0) -> list:
+    """Returns count rules, in the proportions a rules file might have."""
+
+    rng = random.Random(seed)
+    kinds = rng.choices(
+        ("extension", "glob", "regex", "size", "age"), (4, 3, 1, 1, 1), k=count
+    )
+
+    lines = []
+    for i, kind in enumerate(kinds):
+        if kind == "extension":
+            line = f"*.ext{i} | Extension {i}"
+        elif kind == "glob":
+            line = f"report_{i}_*.pdf | Reports"
+        elif kind == "regex":
+            line = f"regex scan{i}_\\d{{4}}\\.png | Scans"
+        elif kind == "size":
+            line = f"size > {rng.randint(1, 1000)} GiB | Large"
+        else:
+            line = f"age > {rng.randint(10, 40)}w | Old"
+
+        lines.append(line)
+
+    # A few rules which do match, at the end so every other rule is checked
+    lines += ["*.pdf | Documents", "item1*.txt | Text", "age > 3w | Old"]
+
+    return [parse_rule(line, number) for number, line in enumerate(lines, 1)]
+
+
+def match_linear(rules: list, entry, now: float):
+    """Returns the first of rules matching entry, checking each in turn."""
+
+    for rule in rules:
+        if rule.kind == "glob":
+            matched = fnmatch.fnmatch(entry.name.lower(), rule.text.lower())
+        elif rule.kind == "regex":
+            matched = re.fullmatch(rule.text, entry.name) is not None
+        elif rule.kind == "size":
+            low, high = parse_interval(rule.text, SIZE_UNITS, "b", whole=True)
+            matched = low <= entry.stat().st_size < high
+        else:
+            low, high = parse_interval(rule.text, AGE_UNITS, "d")
+            matched = low <= now - entry.stat().st_mtime < high
+
+        if matched:
+            return rule
+
+    return None
+
+
+def rate(function, entries: list) -> float:
+    """Returns the items per second function classified entries at."""
+
+    start = time.perf_counter()
+    for entry in entries:
+        function(entry)
+
+    return len(entries) / (time.perf_counter() - start)
+
+
+def main(items=20000, *rule_counts):
+    rule_counts = rule_counts or (10, 100, 1000)
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate(folder, items, mtimes=mtime_range(1), subfolder_ratio=0)
+
+        with os.scandir(folder) as iterator:
+            entries = list(iterator)
+        for entry in entries:
+            entry.stat()
+
+        now = time.time()
+
+        print(f"Items classified per second, {items} items\n")
+        print(f"{'rules':>6} {'compiled':>12} {'one by one':>12}")
+
+        for count in rule_counts:
+            rules = make_rules(count)
+
+            start = time.perf_counter()
+            compiled = Rules(rules)
+            compile_time = time.perf_counter() - start
+
+            # Both must agree on the rule each item matches
+            sample = entries[:200]
+            assert [compiled.match(entry, now) for entry in sample] == [
+                match_linear(rules, entry, now) for entry in sample
+            ]
+
+            fast = rate(lambda entry: compiled.match(entry, now), entries)
+
+            # Checking every rule in Python is slow, so a sample is enough
+            slow = rate(lambda entry: match_linear(rules, entry, now), entries[:2000])
+
+            print(
+                f"{count:>6} {fast:>12,.0f} {slow:>12,.0f}"
+                f"   compiled in {compile_time * 1000:.1f} ms"
+            )
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Times classifying items with compiled sort rules"
+    )
+    parser.add_argument("items", type=int, nargs="?", default=20000)
+    parser.add_argument(
+        "rule_counts",
+        type=int,
+        nargs="*",
+        help="numbers of rules to time with (10, 100 and 1000 by default)",
+    )
+    args = parser.parse_args(argv)
+
+    main(args.items, *args.rule_counts)
+
+
+if __name__ == "__main__":
+    main_cli()
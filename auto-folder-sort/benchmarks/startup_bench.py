@@ -0,0 +1,89 @@
+"""Compares a startup sort which plans every item of a folder with one which
+only plans the items missing from the PlacementIndex snapshot taken at the
+last shutdown.
+
+Note that to run this benchmark, you must execute:
+`python3 -m benchmarks.startup_bench [items left in place] [new items]`
+from the main directory (where main.py is)
+
+The folder is sorted by date, with every item left in place modified before
+the earliest year, so each startup has to look at all of them again unless
+they are found in the snapshot. Logging is disabled while measuring, so the
+"too early" warnings for every item don't end up in logs/sorter.log.
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+
+from assets.index import PlacementIndex, index_path
+from assets.sorter import Sorter
+from benchmarks.generate import generate
+
+OLD_MTIME = time.mktime((2000, 1, 1, 0, 0, 0, 0, 0, -1))
+
+
+def startup(folder, index):
+    """Returns how long a startup sort took and how many items it checked.
+    Without an index, this is a full sort like before indexes existed."""
+
+    sorter = Sorter(folder, "date", 2020)
+    sorter.index = index
+
+    start = time.perf_counter()
+    sorter.sort(skip_unchanged=True)
+    duration = time.perf_counter() - start
+
+    return duration, len(sorter.dir_entries)
+
+
+def main(items=100000, new_items=100):
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as folder:
+        with tempfile.TemporaryDirectory() as state:
+            generate(
+                folder, items, mtimes=(OLD_MTIME, OLD_MTIME), subfolder_ratio=0
+            )
+
+            # Sort once and shut down, taking the snapshot
+            path = index_path(state, folder)
+
+            index = PlacementIndex(path, folder, "date|2020")
+            startup(folder, index)
+            index.save_snapshot()
+            index.close()
+
+            print(f"Startup with {items} items left in place, {new_items} new\n")
+
+            for name in ("full scan", "delta"):
+                generate(folder, new_items, prefix="new", subfolder_ratio=0, seed=1)
+
+                index = None
+                if name == "delta":
+                    index = PlacementIndex(path, folder, "date|2020")
+
+                duration, checked = startup(folder, index)
+
+                if index is not None:
+                    index.close()
+
+                print(f"{name:>9}: {duration * 1000:8.1f} ms  {checked} items checked")
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Times a startup sort with and without a PlacementIndex snapshot"
+    )
+    parser.add_argument(
+        "items", type=int, nargs="?", default=100000, help="items left in place"
+    )
+    parser.add_argument("new_items", type=int, nargs="?", default=100)
+    args = parser.parse_args(argv)
+
+    main(args.items, args.new_items)
+
+
+if __name__ == "__main__":
+    main_cli()
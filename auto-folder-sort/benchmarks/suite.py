@@ -0,0 +1,222 @@
+"""Times the main steps of sorting on synthetic folders, recording the results
+as JSON so they can be compared between versions.
+
+Note that to run this benchmark, you must execute:
+`python3 -m benchmarks.suite [options]`
+from the main directory (where main.py is). Run with --help for the options.
+
+Measured:
+    ensure_file, ensure_date: Creating the sorting folders in an empty folder
+    sort_file, sort_date: Sorter.sort_file()/sort_date() on a generated folder
+    latency: Seconds from a file being created in a watched folder to it
+             being in its sorting folder, through main.CustomEventHandler
+
+Each step is timed on a freshly generated folder for every repeat. Generating
+the folders is not timed. Results are written to stdout as JSON (or to the
+file given with --output), with a summary written to stderr. Passing an
+earlier results file with --compare also prints how each step changed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import main
+from assets.sorter import Sorter
+from benchmarks.generate import generate, mtime_range
+
+
+def version() -> str:
+    """Returns the short hash of the checked out commit, if there is one."""
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarise(runs: list) -> dict:
+    return {"runs": runs, "min": min(runs), "median": statistics.median(runs)}
+
+
+def time_ensure(args, sort_type: str) -> float:
+    with tempfile.TemporaryDirectory() as folder:
+        sorter = Sorter(folder, sort_type, datetime.today().year - args.years)
+        sorter.assert_valid()
+
+        start = time.perf_counter()
+        sorter.s_dict[sort_type][0]()
+        return time.perf_counter() - start
+
+
+def time_sort(args, sort_type: str, seed: int) -> float:
+    with tempfile.TemporaryDirectory() as folder:
+        generate(
+            folder,
+            args.entries,
+            mtimes=mtime_range(args.years),
+            distribution=args.distribution,
+            subfolder_ratio=args.subfolder_ratio,
+            seed=seed,
+        )
+
+        sorter = Sorter(
+            folder,
+            sort_type,
+            datetime.today().year - args.years,
+            move_workers=args.workers,
+        )
+        sorter.assert_valid()
+        sorter.s_dict[sort_type][0]()
+
+        start = time.perf_counter()
+        sorter.s_dict[sort_type][1]()
+        return time.perf_counter() - start
+
+
+def measure_latency(args) -> dict:
+    """Creates files one at a time in a watched folder, timing how long each
+    takes to be sorted."""
+
+    samples = []
+
+    with tempfile.TemporaryDirectory() as folder:
+        handler = main.CustomEventHandler(Sorter(folder, "file_type"))
+        observer = main.make_backend()
+        observer.schedule(handler, folder)
+        observer.start()
+
+        try:
+            for i in range(args.latency_samples):
+                destination = os.path.join(folder, "Documents & Data", f"{i}.txt")
+
+                start = time.perf_counter()
+                with open(os.path.join(folder, f"{i}.txt"), "w"):
+                    pass
+
+                while not os.path.exists(destination):
+                    if time.perf_counter() - start > args.latency_timeout:
+                        break
+                    time.sleep(0.001)
+                else:
+                    samples.append(time.perf_counter() - start)
+        finally:
+            observer.stop()
+            observer.join()
+
+    result = {"samples": len(samples), "lost": args.latency_samples - len(samples)}
+
+    if samples:
+        samples.sort()
+        result.update(
+            p50=samples[len(samples) // 2],
+            p95=samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            max=samples[-1],
+        )
+
+    return result
+
+
+def run(args) -> dict:
+    results = {}
+
+    for sort_type, name in (("file_type", "file"), ("date", "date")):
+        results[f"ensure_{name}"] = summarise(
+            [time_ensure(args, sort_type) for _ in range(args.repeat)]
+        )
+        results[f"sort_{name}"] = summarise(
+            [time_sort(args, sort_type, seed) for seed in range(args.repeat)]
+        )
+
+    if args.latency_samples:
+        results["latency"] = measure_latency(args)
+
+    return {
+        "version": version(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "compare")
+        },
+        "results": results,
+    }
+
+
+def report(results: dict, previous: dict = None) -> None:
+    """Writes a summary of results to stderr, compared with previous if given."""
+
+    for name, result in results["results"].items():
+        key = "p50" if name == "latency" else "median"
+        if key not in result:
+            print(f"{name:>12}: no samples", file=sys.stderr)
+            continue
+
+        line = f"{name:>12}: {result[key] * 1000:9.1f} ms ({key})"
+
+        old = (previous or {}).get("results", {}).get(name, {}).get(key)
+        if old:
+            line += f"  {result[key] / old:5.2f}x {previous.get('version')}"
+
+        print(line, file=sys.stderr)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Times sorting on synthetic folders, recording the results as JSON"
+    )
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument(
+        "--years", type=int, default=5, help="items are modified over this many years"
+    )
+    parser.add_argument(
+        "--distribution", default="uniform", choices=("uniform", "recent")
+    )
+    parser.add_argument("--subfolder-ratio", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=main.MOVE_WORKERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-samples", type=int, default=20)
+    parser.add_argument("--latency-timeout", type=float, default=5.0)
+    parser.add_argument(
+        "--backend", default=main.OBSERVER_BACKEND, choices=("watchdog", "inotify")
+    )
+    parser.add_argument("--output", help="file to write the results to")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    args = parser.parse_args(argv)
+
+    main.OBSERVER_BACKEND = args.backend
+
+    results = run(args)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+
+    report(results, previous)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main_cli()
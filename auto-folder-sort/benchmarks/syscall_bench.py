@@ -0,0 +1,150 @@
+"""Counts the filesystem syscalls made while classifying every item of a
+folder, comparing the old os.listdir based pass with the os.scandir based one.
+
+Note that to run this benchmark, you must execute:
+`python3 -m benchmarks.syscall_bench [number of items]`
+from the main directory (where main.py is)
+
+Calls are counted by wrapping the functions in the os module. os.DirEntry
+methods are counted through a proxy: entry.stat() costs one syscall the first
+time it is called, while entry.is_dir() uses the file type returned by the
+directory listing itself on Linux, so costs none.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections import Counter
+
+from assets.sorter import Sorter
+from benchmarks.generate import generate
+
+counts = Counter()
+
+
+class CountingEntry:
+    """Proxy for os.DirEntry which counts uncached stat calls."""
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.name = entry.name
+        self.path = entry.path
+        self.has_stat = False
+
+    def is_dir(self):
+        return self.entry.is_dir()
+
+    def stat(self):
+        if not self.has_stat:
+            counts["DirEntry.stat"] += 1
+            self.has_stat = True
+        return self.entry.stat()
+
+
+class CountingScandir:
+    def __init__(self, path):
+        self.iterator = real_scandir(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.iterator.close()
+
+    def __iter__(self):
+        for entry in self.iterator:
+            yield CountingEntry(entry)
+
+
+real_scandir = os.scandir
+real_listdir = os.listdir
+real_stat = os.stat
+
+
+def counting_listdir(path):
+    counts["listdir"] += 1
+    return real_listdir(path)
+
+
+def counting_scandir(path):
+    counts["scandir"] += 1
+    return CountingScandir(path)
+
+
+def counting_stat(path, *args, **kwargs):
+    counts["stat"] += 1
+    return real_stat(path, *args, **kwargs)
+
+
+def legacy_pass(folder, sort_type):
+    """The classification done by sort_file/sort_date before os.scandir."""
+
+    for item in os.listdir(folder):
+        path = os.path.join(folder, item)
+
+        if sort_type == "file_type":
+            os.path.isdir(path)
+        else:
+            time.ctime(os.path.getmtime(path))
+
+
+def scandir_pass(sorter):
+    sorter.update_dir_files()
+
+    for entry in sorter.dir_entries:
+        sorter.s_dict[sorter.sort_type][2](entry)
+
+
+def measure(function, *args):
+    """Returns the syscalls made by function and how long it took. Timing is
+    done in a separate run, so the counting wrappers don't affect it."""
+
+    counts.clear()
+    os.listdir, os.scandir, os.stat = counting_listdir, counting_scandir, counting_stat
+
+    try:
+        function(*args)
+    finally:
+        os.listdir, os.scandir, os.stat = real_listdir, real_scandir, real_stat
+
+    start = time.perf_counter()
+    function(*args)
+    duration = time.perf_counter() - start
+
+    return sum(counts.values()), dict(counts), duration
+
+
+def main(items=10000):
+    with tempfile.TemporaryDirectory() as folder:
+        generate(folder, items, {"txt": 1}, subfolder_ratio=0.1)
+
+        print(f"Classifying {items} items\n")
+
+        for sort_type in ("file_type", "date"):
+            sorter = Sorter(folder, sort_type, 1970)
+            sorter.update_years()
+
+            for name, function, args in (
+                ("listdir", legacy_pass, (folder, sort_type)),
+                ("scandir", scandir_pass, (sorter,)),
+            ):
+                total, detail, duration = measure(function, *args)
+                print(
+                    f"{sort_type:>9} {name}: {total:>6} syscalls "
+                    f"{duration * 1000:8.1f} ms  {detail}"
+                )
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Counts the filesystem syscalls made while classifying a folder"
+    )
+    parser.add_argument("items", type=int, nargs="?", default=10000)
+    args = parser.parse_args(argv)
+
+    main(args.items)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,17 +1,129 @@
+import argparse
+import asyncio
+import json
 import logging
+import multiprocessing
 import os
+import signal
+import sqlite3
+import sys
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
-from assets.sorter import Sorter
+from assets.index import PlacementIndex, index_path
+from assets.inotify import InotifyLoop
+from assets.latency import LatencyHistogram
+from assets.logqueue import listen
+from assets.metrics import FileExporter, Metrics, SocketExporter
+from assets.rules import load_rules
+from assets.runtime import AsyncRuntime
+from assets.scheduler import DebouncedScheduler
+from assets.sniff import Sniffer
+from assets.sorter import Sorter, start_journal
+from assets.stability import StabilityGate, TimerWheel
+from assets.suppressor import SelfEventFilter
 
 # CONSTANTS
 DIR_PATH = os.path.dirname(os.path.abspath(__file__))
 LOG_PATH = os.path.join(DIR_PATH, "logs", "main.log")
 COMMANDS_PATH = os.path.join(DIR_PATH, "folders_to_track.txt")
+STATE_PATH = os.path.join(DIR_PATH, "state")
+RULES_PATH = os.path.join(DIR_PATH, "sort_rules.txt")
+
+# When True, created/moved events only sort the affected item instead of
+# running a full sort of the tracked folder
+INCREMENTAL_SORT = True
+
+# Events are coalesced until none have arrived for DEBOUNCE_QUIET seconds,
+# or the first event has waited DEBOUNCE_MAX_LATENCY seconds
+DEBOUNCE_QUIET = 0.25
+DEBOUNCE_MAX_LATENCY = 2.0
+
+# When True, sorting folders are only created once something is sorted into
+# them, instead of creating every year and month folder up front
+LAZY_FOLDERS = False
+
+# When True, files whose extension isn't in any file type folder (or which
+# have none) are classified by their first bytes instead of going to "Other".
+# Results for up to SNIFF_CACHE_SIZE files are kept, so each is read only once
+CONTENT_SNIFFING = False
+SNIFF_CACHE_SIZE = 10000
+
+# If set, files modified less than STABILITY_QUIET seconds ago are held back
+# until their size and mtime stop changing for that long, or (with the inotify
+# backend) until they are closed after writing, so nothing is moved while it
+# is still being written. Partial downloads (.part, .crdownload...) are then
+# never moved. Held files are checked again every STABILITY_TICK seconds at
+# most, by one thread shared by every folder
+STABILITY_QUIET = None
+STABILITY_TICK = 0.05
+
+# Number of threads each sorter moves items with, and whether each destination
+# device gets its own pool of that many threads
+MOVE_WORKERS = 4
+MOVE_POOL_PER_DEVICE = False
+
+# "inotify" (Linux only) to watch every tracked folder from one thread with a
+# single inotify instance, or "watchdog" to use a single watchdog Observer for
+# every tracked folder. watchdog is used if inotify can't be started. See the
+# README for the threads and file descriptors each uses
+OBSERVER_BACKEND = "inotify"
+
+# Sorting only ever looks at the top level of a tracked folder, so by default
+# subfolders (including the generated sorting folders) are not watched. Set
+# to True to have the watchdog backend add a watch for every subfolder
+WATCH_RECURSIVE = False
+
+# Used by the asyncio runtime (main.py --asyncio): number of threads shared by
+# every folder for sorting, and most events queued per folder before the
+# folder is fully sorted instead
+ASYNC_WORKERS = 4
+ASYNC_QUEUE_SIZE = 10000
+
+# The first sort of every tracked folder is run at the same time on a pool of
+# STARTUP_WORKERS threads, or processes if STARTUP_POOL is "process" (which
+# suits CPU bound sorts of many folders, but metrics aren't kept for them).
+# Each folder is watched once its first sort is done, then checked again once
+# watching starts for anything added in between
+STARTUP_WORKERS = 4
+STARTUP_POOL = "thread"
+
+# When True, COMMANDS_PATH is watched while running, and folders added,
+# removed or changed in it are started or stopped without touching the others
+RELOAD_COMMANDS = True
+
+# If RULES_PATH exists, its rules are checked before the sort type of every
+# folder, e.g. to leave partial downloads in place or move large files to
+# their own folder. See examples/sort_rules.txt for the format
+USE_RULES = True
+
+# When True, each tracked folder gets a PlacementIndex in STATE_PATH, and the
+# startup sort is skipped for folders unchanged since they were last sorted
+PLACEMENT_INDEX = True
+
+# When True, the time spent in each phase of sorting and counts of the moves
+# made are recorded, and written in the Prometheus text format to METRICS_PATH
+# every METRICS_INTERVAL seconds. They are also served on METRICS_ADDRESS if
+# set, either a (host, port) tuple or the path of a Unix socket
+METRICS_ENABLED = False
+METRICS_PATH = os.path.join(STATE_PATH, "metrics.prom")
+METRICS_INTERVAL = 15.0
+METRICS_ADDRESS = None
+
+# Events whose item takes at least this many seconds to be sorted after the
+# event was received are logged, with how long they were queued for. None to
+# only keep them in the latency histograms
+LATENCY_SLOW_THRESHOLD = None
+
+# If set, a line of JSON (time, folder, source and destination) is written
+# to this file for every item moved, e.g. os.path.join(DIR_PATH, "logs",
+# "moves.jsonl")
+MOVE_JOURNAL_PATH = None
 
 # LOG
 logger = logging.getLogger(__name__)
@@ -21,130 +133,935 @@ formatter = logging.Formatter("\n%(levelname)s\nTime: %(asctime)s\n%(message)s")
 file_handler = logging.FileHandler(LOG_PATH)
 file_handler.setFormatter(formatter)
 
-logger.addHandler(file_handler)
+# Records are written to the file from a background thread
+listener = listen(logger, file_handler)
+
+# Shared by every sorter, so the cache holds the files of every folder
+sniffer = Sniffer(SNIFF_CACHE_SIZE)
+
+# Shared by every event handler's StabilityGate
+timer_wheel = TimerWheel(STABILITY_TICK)
 
 
 # EVENT HANDLER CLASS
 class CustomEventHandler(FileSystemEventHandler):
-    def __init__(self, sorter):
+    def __init__(
+        self,
+        sorter,
+        incremental=INCREMENTAL_SORT,
+        quiet=DEBOUNCE_QUIET,
+        max_latency=DEBOUNCE_MAX_LATENCY,
+        slow_threshold=LATENCY_SLOW_THRESHOLD,
+        initial_sort=True,
+        stability_quiet=STABILITY_QUIET,
+        wheel=None,
+    ):
         self.sorter = sorter
+        self.incremental = incremental
+        self.root = os.path.normpath(self.sorter.folder)
+
+        # Time each pending path (None for a full sort) was first received,
+        # to measure how long it takes from an event arriving to its item
+        # being sorted
+        self.received = {}
+        self.received_lock = threading.Lock()
+        self.slow_threshold = slow_threshold
+
+        if self.sorter.metrics is not None:
+            self.latency = self.sorter.metrics.histogram(
+                "event_latency_seconds", folder=self.root
+            )
+        else:
+            self.latency = LatencyHistogram()
+
+        # Sorts are run off the watchdog thread, once per burst of events
+        self.scheduler = DebouncedScheduler(self.sort_batch, quiet, max_latency)
+        self.sort_lock = threading.Lock()
+
+        # Set when events were lost, so the next batch is a full sort
+        self.reconcile_pending = False
 
-        # Run sorter for the first time, in case folder has not
-        # been sorted before. Returns True if sort was successful
-        self.was_sorted = self.sorter.sort()
+        # Drops the events caused by the sorter's own moves
+        self.suppressor = SelfEventFilter()
+        self.sorter.suppressor = self.suppressor
+
+        # Holds back files still being written, queueing each once it settles
+        if stability_quiet is not None:
+            self.stability = StabilityGate(
+                self.enqueue, stability_quiet, wheel or timer_wheel
+            )
+        else:
+            self.stability = None
+        self.sorter.stability = self.stability
+
+        # If False, self.initial_sort() must be called before watching
+        if initial_sort:
+            self.initial_sort()
+
+    def initial_sort(self):
+        """Runs sorter for the first time, in case folder has not been sorted
+        before (or has changed since it last was, if the sorter has an index).
+        Raises IOError if the sort was not successful."""
+
+        # Held items released meanwhile wait for it rather than being sorted
+        # alongside it
+        with self.sort_lock:
+            self.was_sorted = self.sorter.sort(skip_unchanged=True)
 
         if not self.was_sorted:
             logger.warning(
-                f"\nSorter for {self.sorter.folder} was not able to sort successfully."
-                f"\nSorter valid: {self.sorter.assert_valid()}"
+                "\nSorter for %s was not able to sort successfully.\nSorter valid: %s",
+                self.sorter.folder,
+                self.sorter.is_valid(),
             )
 
             raise IOError
 
-    def on_modified(self, event):
-        logger.info(f"Folder {event.src_path} modified")
+    def reconcile(self, skip_unchanged=False):
+        """Runs a full sort of the tracked folder, to catch anything
+        incremental sorting may have missed.
+
+        skip_unchanged: See Sorter.sort(), to only sort what was added since
+                        the folder was last fully sorted
+        """
 
-        self.was_sorted = self.sorter.sort()
+        started = time.monotonic()
+
+        with self.sort_lock:
+            self.was_sorted = self.sorter.sort(skip_unchanged)
+
+        # Every item whose event was received before the sort began has been
+        # handled by it, including any dropped from a batch or queue
+        finished = time.monotonic()
+        with self.received_lock:
+            covered = [
+                path
+                for path, received in self.received.items()
+                if received <= started and not self.is_held(path)
+            ]
+
+        for path in covered:
+            self.record_latency(path, started, finished)
 
         if not self.was_sorted:
             logger.warning(
-                f"\nSorter for {self.sorter.folder} was not able to sort successfully."
-                f"\nSorter valid: {self.sorter.assert_valid()}"
+                "\nSorter for %s was not able to sort successfully.\nSorter valid: %s",
+                self.sorter.folder,
+                self.sorter.is_valid(),
             )
 
+    def is_relevant(self, event):
+        """Returns whether event affects the tracked folder itself or an item
+        directly inside of it, other than the generated sorting folders."""
+
+        generated = None
+
+        for path in (event.src_path, getattr(event, "dest_path", None)):
+            if not path:
+                continue
+
+            path = os.path.normpath(path)
+            if path == self.root:
+                return True
+
+            if os.path.dirname(path) == self.root:
+                if generated is None:
+                    generated = self.sorter.generated_folders()
+
+                if os.path.basename(path) not in generated:
+                    return True
+
+        return False
+
+    def dispatch(self, event):
+        if not self.is_relevant(event):
+            return
+
+        # Sorter's validity is cached, so has to be checked again if the
+        # tracked folder itself is removed
+        if event.event_type in ("deleted", "moved"):
+            if os.path.normpath(event.src_path) == self.root:
+                self.sorter.invalidate()
+
+        # Only reported by InotifyLoop, and unknown to FileSystemEventHandler
+        if event.event_type == "closed":
+            self.on_closed(event)
+            return
+
+        if self.suppressor.is_own(event):
+            logger.debug("Suppressed event caused by sorter: %s", event)
+            return
+
+        super().dispatch(event)
+
+    def sort_path(self, path):
+        """Sorts only the item at path, if it is directly inside the tracked folder.
+        Returns whether the item was moved."""
+
+        if os.path.dirname(os.path.normpath(path)) != self.root:
+            return False
+
+        try:
+            return self.sorter.sort_entry(os.path.basename(path))
+        except OSError:
+            logger.exception("Error while sorting %s", path)
+            return False
+
+    def stop_holding(self):
+        """Sorts anything waiting for its burst to end, then stops holding
+        back files still being written. Those are left for the next startup
+        sort, as the folder is no longer marked as sorted."""
+
+        self.scheduler.flush()
+
+        if self.stability is not None:
+            self.stability.clear()
+
+            # Files released while the last batch was being sorted
+            self.scheduler.flush()
+
+    def is_held(self, path):
+        """Returns whether the item at path is being held back by
+        self.stability, so will be queued again once it settles."""
+
+        return self.stability is not None and path in self.stability.held
+
+    def enqueue(self, path=None):
+        """Stamps the time an event for path was received, then queues it."""
+
+        with self.received_lock:
+            self.received.setdefault(path, time.monotonic())
+
+        self.scheduler.notify(path)
+
+    def record_latency(self, path, started, finished):
+        """Records how long the item at path (None for a full sort) took to
+        be sorted since its event was received. started is when sorting it
+        began, so the time spent queued can be logged for slow events."""
+
+        with self.received_lock:
+            received = self.received.pop(path, None)
+
+        if received is None:
+            return
+
+        latency = finished - received
+        self.latency.record(latency)
+
+        if self.slow_threshold is not None and latency >= self.slow_threshold:
+            logger.warning(
+                "\nSlow event: %s was sorted %.3fs after its event was received"
+                "\nQueued: %.3fs\nSorting: %.3fs",
+                path or self.root,
+                latency,
+                started - received,
+                finished - started,
+            )
+
+    def sort_batch(self, paths):
+        """Called by self.scheduler once per burst of events."""
+
+        if not self.incremental or self.reconcile_pending:
+            self.reconcile_pending = False
+            self.reconcile()
+            return
+
+        with self.sort_lock:
+            for path in paths:
+                started = time.monotonic()
+
+                if self.sort_path(path):
+                    self.record_latency(path, started, time.monotonic())
+                elif not self.is_held(path):
+                    # Nothing was moved, e.g. a rule left the item in place.
+                    # Held items keep the time their first event was received
+                    # instead, so their latency includes the time held for
+                    with self.received_lock:
+                        self.received.pop(path, None)
+
+            # Only the paths in the batch were sorted, so the folder isn't
+            # marked as sorted, but where they went is written in one go
+            if self.sorter.index is not None:
+                try:
+                    self.sorter.index.flush_placements()
+                except (OSError, sqlite3.Error):
+                    logger.exception("Could not update index of %s", self.root)
+
+    def on_overflow(self):
+        """Called by InotifyLoop if events were lost, which makes a full
+        sort necessary. The sort is only queued, so InotifyLoop can go back
+        to reading events straight away."""
+
+        logger.warning("\nEvents were lost for %s, reconciling.", self.sorter.folder)
+
+        self.reconcile_pending = True
+        self.enqueue()
+
+    def on_created(self, event):
+        if self.incremental:
+            self.enqueue(event.src_path)
+
+    def on_moved(self, event):
+        if self.stability is not None:
+            self.stability.renamed(event.src_path, event.dest_path)
+
+        if self.incremental:
+            self.enqueue(event.dest_path)
+
+    def on_closed(self, event):
+        """Called when a file was closed after being written to, so it can be
+        sorted straight away if it was being held back."""
+
+        if self.stability is not None:
+            self.stability.closed_write(event.src_path)
+
+    def on_modified(self, event):
+        if self.incremental:
+            return
+
+        logger.info("Folder %s modified", event.src_path)
+
+        self.enqueue()
+
+
+class CommandsEventHandler(FileSystemEventHandler):
+    """Calls callback once per burst of changes to the commands file at path,
+    including it being replaced, as many editors do when saving."""
+
+    def __init__(
+        self, path, callback, quiet=DEBOUNCE_QUIET, max_latency=DEBOUNCE_MAX_LATENCY
+    ):
+        self.path = os.path.normpath(path)
+        self.callback = callback
+        self.scheduler = DebouncedScheduler(self.reload, quiet, max_latency)
+
+    def reload(self, items):
+        """Called by self.scheduler once per burst of changes."""
+
+        self.callback()
+
+    def dispatch(self, event):
+        if event.event_type == "moved":
+            path = event.dest_path
+        elif event.event_type in ("created", "modified"):
+            path = event.src_path
+        else:
+            return
+
+        if os.path.normpath(path) == self.path:
+            self.scheduler.notify()
+
 
 # MAIN CLASS
+def read_commands(path):
+    """Returns the commands in the text file at path, a list with the folder,
+    sort type and (optionally) earliest year of each line. Raises ValueError
+    if any line is not a valid command."""
+
+    with open(path, "r") as txt:
+        # Splits each line at '|' and strips each item of trailing whitespace
+        commands = [list(map(str.strip, line.split("|"))) for line in txt.readlines()]
+
+    logger.debug("Commands read from text file: %s", commands)
+
+    # Validate commands
+    for command in commands:
+        # Note that wheteher commands are correct folder paths,
+        # valid year etc. are checked within the Sorter class
+        # and return an error there
+
+        if not 1 < len(command) < 4:
+            logger.error(
+                "\nA provided command in %s has less than 2 or more than 3 parameters."
+                "\nFull command/line in file: %s",
+                path,
+                command,
+            )
+        elif command[1] not in ("date", "file_type"):
+            logger.error(
+                "\nA provided command in %s has given an"
+                "\ninvalid sort type. Sort type given: %s"
+                "\nFull command/line in file: %s",
+                path,
+                command[1],
+                command,
+            )
+        else:
+            continue
+
+        raise ValueError(f"Please fix commands given at {path}")
+
+    return commands
+
+
+def make_sorter(folder, sort_type, earliest_year, settings):
+    """Returns the Sorter for a folder. settings is a tuple of the lazy
+    folders, move workers and pool per device options, whether to sniff the
+    content of files, then the path of the sorter's PlacementIndex file and of
+    its rules file, each None if not used."""
+
+    lazy_folders, move_workers, pool_per_device, sniff, index_file, rules_file = (
+        settings
+    )
+
+    sorter = Sorter(
+        folder, sort_type, earliest_year, lazy_folders, move_workers, pool_per_device
+    )
+
+    if sniff:
+        sorter.sniffer = sniffer
+
+    if rules_file is not None:
+        sorter.rules = load_rules(rules_file)
+
+    if index_file is not None:
+        # Changing the rules changes where items go, like the sort type
+        config = f"{sort_type}|{earliest_year}"
+        if rules_file is not None:
+            config += f"|{os.stat(rules_file).st_mtime_ns}"
+
+        sorter.index = PlacementIndex(index_file, folder, config)
+
+    return sorter
+
+
+def current_rules_file():
+    """Returns RULES_PATH if USE_RULES is True and it exists, otherwise None."""
+
+    return RULES_PATH if USE_RULES and os.path.isfile(RULES_PATH) else None
+
+
+def sorter_settings(folder):
+    """Returns the settings make_sorter() uses for folder, based on the
+    constants at the top of this file."""
+
+    index_file = index_path(STATE_PATH, folder) if PLACEMENT_INDEX else None
+    rules_file = current_rules_file()
+
+    return (
+        LAZY_FOLDERS,
+        MOVE_WORKERS,
+        MOVE_POOL_PER_DEVICE,
+        CONTENT_SNIFFING,
+        index_file,
+        rules_file,
+    )
+
+
+def timed_initial_sort(handler):
+    """Runs handler's initial sort, returning the seconds it took."""
+
+    start = time.perf_counter()
+    handler.initial_sort()
+
+    return time.perf_counter() - start
+
+
+def initial_sort_process(folder, sort_type, earliest_year, settings):
+    """Runs the first sort of a folder in a worker process, for
+    Main.startup_sort(). Returns the seconds it took, raising IOError if the
+    sort was not successful."""
+
+    start = time.perf_counter()
+    sorter = make_sorter(folder, sort_type, earliest_year, settings)
+
+    try:
+        if not sorter.sort(skip_unchanged=True):
+            raise IOError(f"Sorter for {folder} was not able to sort successfully")
+    finally:
+        if sorter.index is not None:
+            sorter.index.save_snapshot()
+            sorter.index.close()
+
+    return time.perf_counter() - start
+
+
+def make_backend():
+    """Returns the observer object every tracked folder is watched with,
+    based on OBSERVER_BACKEND."""
+
+    if OBSERVER_BACKEND == "inotify":
+        try:
+            return InotifyLoop()
+        except (OSError, AttributeError, TypeError):
+            # AttributeError or TypeError if libc has no inotify functions
+            logger.exception("\nCould not start inotify backend, using watchdog.")
+
+    return Observer()
+
+
 class Main:
     def __init__(self):
+        # Every tracked folder is watched by this one observer, so
+        # self.observers maps each folder to the same object
+        self.observer = make_backend()
         self.observers = {}
+        self.watches = {}
+        self.handlers = {}
 
-        # Get commands from text file
-        with open(COMMANDS_PATH, "r") as txt:
-            # Splits each line at '|' and strips each item of trailing whitespace
-            self.commands = [
-                list(map(str.strip, line.split("|"))) for line in txt.readlines()
-            ]
+        # Seconds taken by the first sort of each folder, see self.startup_sort()
+        self.startup_durations = {}
 
-        logger.debug(f"Commands read from text file: {self.commands}")
+        self.metrics = Metrics() if METRICS_ENABLED else None
+        self.exporters = []
 
-        # Validate commands
-        for command in self.commands:
-            # Note that wheteher commands are correct folder paths,
-            # valid year etc. are checked within the Sorter class
-            # and return an error there
-
-            if not 1 < len(command) < 4:
-                logger.error(
-                    f"\nA provided command in {COMMANDS_PATH} has less than 2 or more than 3 parameters."
-                    f"\nFull command/line in file: {command}"
-                )
-            elif command[1] not in ("date", "file_type"):
-                logger.error(
-                    f"\nA provided command in {COMMANDS_PATH} has given an"
-                    f"\ninvalid sort type. Sort type given: {command[1]}"
-                    f"\nFull command/line in file: {command}"
-                )
-            else:
-                continue
+        # Set by self.serve() while the asyncio runtime is running
+        self.runtime = None
+        self.loop = None
+
+        # Set by self.watch_commands()
+        self.commands_handler = None
 
-            raise ValueError(f"Please fix commands given at {COMMANDS_PATH}")
+        # Get commands from text file
+        self.commands = read_commands(COMMANDS_PATH)
 
     # HELPER METHODS
-    def make_observer(self, folder, sort_type, earliest_year):
-        """Generates an observer object, as well as the sorter and event handler for it."""
+    def make_observer(self, folder, sort_type, earliest_year, initial_sort=True):
+        """Generates the sorter and event handler for a folder, sorts the
+        folder and schedules it to be watched by self.observer, which is
+        returned.
+
+        If initial_sort is False, the folder is neither sorted nor watched
+        until self.startup_sort() is called.
+        """
+
+        sorter = make_sorter(folder, sort_type, earliest_year, sorter_settings(folder))
+        sorter.metrics = self.metrics
+
+        event_handler = CustomEventHandler(
+            sorter, initial_sort=initial_sort, stability_quiet=STABILITY_QUIET
+        )
+        self.handlers[folder] = event_handler
+
+        if initial_sort:
+            self.watch(folder)
+
+        return self.observer
+
+    def watch(self, folder):
+        """Schedules a folder in self.handlers to be watched by self.observer,
+        catching up with anything added since its first sort if self.observer
+        is already running."""
+
+        self.watches[folder] = self.observer.schedule(
+            self.handlers[folder], folder, recursive=WATCH_RECURSIVE
+        )
+
+        if self.observer.is_alive():
+            self.catch_up(folder)
+
+    def catch_up(self, folder):
+        """Sorts anything added to a watched folder after its first sort and
+        before self.observer was running, as no events were received for it.
+        Only the items missing from its index's snapshot are sorted, or none
+        at all if the folder is unchanged."""
+
+        self.handlers[folder].reconcile(skip_unchanged=True)
+
+    def startup_sort(self):
+        """Runs the first sort of every folder which isn't watched yet, all at
+        the same time on a pool of STARTUP_WORKERS threads or processes (see
+        STARTUP_POOL). Each folder is watched as soon as its sort is done,
+        see self.watch() for anything added to it meanwhile.
+
+        Returns a dict of the seconds each folder's sort took, also kept in
+        self.startup_durations. Raises IOError once every sort is done if
+        any of them was not successful.
+        """
+
+        folders = [folder for folder in self.handlers if folder not in self.watches]
+        in_process = STARTUP_POOL == "process"
+
+        if in_process:
+            pool = ProcessPoolExecutor(
+                STARTUP_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            pool = ThreadPoolExecutor(STARTUP_WORKERS)
+
+        failed = []
+
+        with pool:
+            futures = {}
+            for folder in folders:
+                handler = self.handlers[folder]
+
+                if in_process:
+                    sorter = handler.sorter
+                    future = pool.submit(
+                        initial_sort_process,
+                        folder,
+                        sorter.sort_type,
+                        sorter.earliest_year,
+                        sorter_settings(folder),
+                    )
+                else:
+                    future = pool.submit(timed_initial_sort, handler)
+
+                futures[future] = folder
+
+            for future in as_completed(futures):
+                folder = futures[future]
+
+                try:
+                    self.startup_durations[folder] = future.result()
+                except IOError:
+                    logger.exception("\nFirst sort of %s failed", folder)
+                    failed.append(folder)
+                    continue
+
+                sorter = self.handlers[folder].sorter
+                if in_process and sorter.index is not None:
+                    # Snapshot was updated by the worker process
+                    sorter.index.load_snapshot()
 
-        sorter = Sorter(folder, sort_type, earliest_year)
+                self.watch(folder)
 
-        event_handler = CustomEventHandler(sorter)
+                logger.info(
+                    "\nFirst sort of %s took %.3fs",
+                    folder,
+                    self.startup_durations[folder],
+                )
+
+        if failed:
+            raise IOError(f"First sort was not successful for: {failed}")
 
-        observer = Observer()
-        observer.schedule(event_handler, folder, recursive=True)
+        return {folder: self.startup_durations[folder] for folder in folders}
 
-        return observer
+    def add_observer(
+        self,
+        folder,
+        sort_type,
+        earliest_year=datetime.today().year,
+        initial_sort=True,
+    ):
+        """Adds an observer object for a specific folder to self.observers.
 
-    def add_observer(self, folder, sort_type, earliest_year=datetime.today().year):
-        """Adds an observer object for a specific folder to self.observers."""
+        initial_sort: If False, see self.make_observer()
+        """
 
         if folder not in self.observers:
-            new_observer = self.make_observer(folder, sort_type, earliest_year)
+            new_observer = self.make_observer(
+                folder, sort_type, earliest_year, initial_sort
+            )
             self.observers[folder] = new_observer
 
             logger.info(
-                f"\nObserver created for {folder} and added to self.observers."
-                f"\nCurrent state of self.observers: {self.observers}"
+                "\nObserver created for %s and added to self.observers."
+                "\nCurrent state of self.observers: %s",
+                folder,
+                self.observers,
             )
         else:
             logger.warning(
                 "\nObserver could not be created as there is already an observer"
-                f"\nmonitoring the folder: {folder}"
+                "\nmonitoring the folder: %s",
+                folder,
             )
 
     def setup_observers(self):
         """Creates self.observers by instantiating observer objects
-        based on self.commands."""
+        based on self.commands, then sorts every folder at the same time
+        with self.startup_sort()."""
+
+        for command in self.commands:
+            self.add_command(command, initial_sort=False)
+
+        self.startup_sort()
+
+    def add_command(self, command, initial_sort=True):
+        """Adds an observer for a command read from COMMANDS_PATH."""
+
+        if len(command) == 2:
+            self.add_observer(command[0], command[1], initial_sort=initial_sort)
+        elif len(command) == 3:
+            self.add_observer(
+                command[0], command[1], int(command[2]), initial_sort=initial_sort
+            )
+
+    def remove_observer(self, folder):
+        """Stops watching a folder, sorting its pending events first, and
+        closes its index. The other folders are left running."""
+
+        watch = self.watches.pop(folder, None)
+        if watch is not None:
+            self.observer.unschedule(watch)
+
+        handler = self.handlers.pop(folder)
+        del self.observers[folder]
+        self.startup_durations.pop(folder, None)
+
+        handler.stop_holding()
+
+        # The runtime sorts the events still queued for the folder
+        if self.runtime is not None:
+            self.call_in_loop(self.runtime.remove, handler)
+
+        if handler.sorter.index is not None:
+            handler.sorter.index.save_snapshot()
+            handler.sorter.index.close()
+
+        logger.info("\nObserver for %s removed from self.observers.", folder)
+
+    def reload_commands(self):
+        """Reads COMMANDS_PATH again and compares it with self.commands, only
+        stopping the folders whose line was removed or changed and starting
+        the ones whose line was added or changed. Every other folder keeps
+        running as it was, so is not sorted again.
+
+        Returns the lists of folders (added, removed). If the file is not
+        valid, it is logged and nothing is changed. Folders whose first sort
+        fails are not added, and are tried again the next time the file is
+        reloaded with their line in it.
+        """
+
+        # Observers have been stopped, so the program is shutting down
+        if not self.observer.is_alive():
+            return [], []
+
+        try:
+            commands = read_commands(COMMANDS_PATH)
+        except (OSError, ValueError):
+            logger.exception(
+                "\nCould not reload %s, keeping the current folders.", COMMANDS_PATH
+            )
+            return [], []
+
+        old = {command[0]: command for command in self.commands}
+        new = {command[0]: command for command in commands}
+
+        removed = [folder for folder in old if new.get(folder) != old[folder]]
+        added = [folder for folder in new if old.get(folder) != new[folder]]
+
+        for folder in removed:
+            if folder in self.observers:
+                self.remove_observer(folder)
+
+        for folder in added:
+            self.add_command(new[folder], initial_sort=False)
+
+            if self.runtime is not None and folder in self.handlers:
+                self.call_in_loop(self.runtime.add, self.handlers[folder])
+
+        try:
+            self.startup_sort()
+        except IOError:
+            # Folders which could not be sorted are not watched, and their line
+            # is left out (or the old one kept) so saving it again retries them
+            failed = [folder for folder in added if folder not in self.watches]
+
+            for folder in failed:
+                if folder in self.observers:
+                    self.remove_observer(folder)
+
+            commands = [
+                old.get(command[0]) if command[0] in failed else command
+                for command in commands
+            ]
+            commands = [command for command in commands if command is not None]
+            added = [folder for folder in added if folder not in failed]
+
+        self.commands = commands
+
+        logger.info(
+            "\nReloaded %s.\nFolders added: %s\nFolders removed: %s",
+            COMMANDS_PATH,
+            added,
+            removed,
+        )
+
+        return added, removed
+
+    def watch_commands(self):
+        """Watches COMMANDS_PATH, reloading it whenever it changes, if
+        RELOAD_COMMANDS is True."""
+
+        if not RELOAD_COMMANDS:
+            return
+
+        self.commands_handler = CommandsEventHandler(
+            COMMANDS_PATH, self.reload_commands
+        )
+        self.observer.schedule(self.commands_handler, os.path.dirname(COMMANDS_PATH))
+
+    def call_in_loop(self, function, *args):
+        """Calls function (or awaits it, if it is a coroutine function) in the
+        asyncio runtime's event loop from another thread, returning its result."""
+
+        async def call():
+            result = function(*args)
+            if asyncio.iscoroutine(result):
+                result = await result
+            return result
+
+        return asyncio.run_coroutine_threadsafe(call(), self.loop).result()
+
+    def dry_run(self, output):
+        """Writes the moves needed to sort each folder in self.commands to
+        output (a text file object) as JSON lines, without moving anything
+        or creating any folders."""
 
         for command in self.commands:
             if len(command) == 2:
-                self.add_observer(command[0], command[1])
-            elif len(command) == 3:
-                self.add_observer(command[0], command[1], int(command[2]))
+                sorter = Sorter(command[0], command[1])
+            else:
+                sorter = Sorter(command[0], command[1], int(command[2]))
+
+            if current_rules_file() is not None:
+                sorter.rules = load_rules(current_rules_file())
+
+            if CONTENT_SNIFFING:
+                sorter.sniffer = sniffer
+
+            if not sorter.is_valid():
+                logger.warning(
+                    "\nDry run skipped %s as its Sorter is not valid."
+                    "\nFull command/line in file: %s",
+                    sorter.folder,
+                    command,
+                )
+                continue
+
+            for move in sorter.plan():
+                output.write(json.dumps({"folder": sorter.folder, **move._asdict()}))
+                output.write("\n")
+
+    def reconcile(self, *args):
+        """Runs a full sort of every tracked folder. Also used as a signal
+        handler, so a reconcile can be requested with `kill -HUP <pid>`."""
+
+        for handler in self.handlers.values():
+            handler.reconcile()
+
+    def start_journal(self):
+        """Starts writing the move journal, if MOVE_JOURNAL_PATH is set."""
+
+        if MOVE_JOURNAL_PATH is not None:
+            start_journal(MOVE_JOURNAL_PATH)
+
+    def start_metrics(self):
+        """Starts writing (and serving, if METRICS_ADDRESS is set) self.metrics."""
+
+        if self.metrics is None:
+            return
+
+        self.exporters.append(
+            FileExporter(self.metrics, METRICS_PATH, METRICS_INTERVAL)
+        )
+        if METRICS_ADDRESS is not None:
+            self.exporters.append(SocketExporter(self.metrics, METRICS_ADDRESS))
+
+        for exporter in self.exporters:
+            exporter.start()
+
+    def stop_metrics(self):
+        for exporter in self.exporters:
+            exporter.stop()
+
+        self.exporters = []
+
+    def start_observers(self):
+        """Starts watching every folder in self.observers."""
+
+        if not self.observer.is_alive():
+            self.observer.start()
+
+            for folder in self.watches:
+                self.catch_up(folder)
 
     def stop_observers(self):
         """Stops all observers in self.observers from running. Used before program
         shuts down"""
 
-        for observer in self.observers.values():
-            observer.stop()
-            observer.join()
+        if self.observer.is_alive():
+            self.observer.stop()
+            self.observer.join()
+
+        # Waits for a reload of COMMANDS_PATH which may be running
+        if self.commands_handler is not None:
+            self.commands_handler.scheduler.flush()
+
+        for folder, handler in self.handlers.items():
+            handler.stop_holding()
+
+            logger.info(
+                "\nEvents suppressed for %s: %s"
+                "\nEvents received: %s"
+                "\nSorts executed: %s"
+                "\nEvent latency (seconds): %s",
+                folder,
+                handler.suppressor.suppressed,
+                handler.scheduler.events_received,
+                handler.scheduler.runs,
+                handler.latency.summary(),
+            )
+
+    def close_indexes(self):
+        """Saves the snapshot of, then closes, the PlacementIndex of every
+        tracked folder. Used after the observers have been stopped and every
+        pending event sorted."""
+
+        for handler in self.handlers.values():
+            if handler.sorter.index is not None:
+                handler.sorter.index.save_snapshot()
+                handler.sorter.index.close()
+
+    async def serve(self):
+        """asyncio version of self.run(). Events are queued per folder and
+        sorted by tasks on a shared thread pool, until SIGINT or SIGTERM."""
+
+        loop = asyncio.get_running_loop()
+
+        runtime = AsyncRuntime(
+            ASYNC_WORKERS, ASYNC_QUEUE_SIZE, DEBOUNCE_QUIET, DEBOUNCE_MAX_LATENCY
+        )
+        for handler in self.handlers.values():
+            runtime.add(handler)
+
+        self.runtime = runtime
+        self.loop = loop
+
+        self.start_observers()
+
+        stop = asyncio.Event()
+        for signal_name in ("SIGINT", "SIGTERM"):
+            loop.add_signal_handler(getattr(signal, signal_name), stop.set)
+        loop.add_signal_handler(signal.SIGHUP, runtime.reconcile)
+
+        await stop.wait()
+
+        logger.debug("Stop signal received. Stopping observers.")
+
+        # Stop new events first, then sort the ones already queued
+        await loop.run_in_executor(None, self.stop_observers)
+        await runtime.shutdown()
+        self.runtime = None
+
+        self.close_indexes()
+        self.stop_metrics()
+
+    def run_async(self):
+        """Main method for the asyncio runtime (Unix only)."""
+
+        self.start_journal()
+        self.setup_observers()
+        self.watch_commands()
+        self.start_metrics()
+
+        asyncio.run(self.serve())
 
     # MAIN
     def run(self):
         """Main method, keeps observers in self.observers running."""
 
+        self.start_journal()
         self.setup_observers()
+        self.watch_commands()
+        self.start_metrics()
+        self.start_observers()
 
-        for observer in self.observers.values():
-            observer.start()
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.reconcile)
 
         try:
             while True:
@@ -154,13 +1071,46 @@ class Main:
             logger.debug("Keyboard interrupt detected. Observers have been stopped.")
 
             self.stop_observers()
+            self.close_indexes()
+            self.stop_metrics()
 
         except IOError:
             self.stop_observers()
+            self.close_indexes()
+            self.stop_metrics()
 
             logger.exception("IOError detected. Observers have been stopped.")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=f"Sorts and tracks the folders listed in {COMMANDS_PATH}"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="write the moves needed to sort each folder as JSON lines and exit",
+    )
+    parser.add_argument(
+        "--output", help="file to write the dry run moves to (default: stdout)"
+    )
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="sort events from an asyncio event loop on a shared thread pool, "
+        "instead of starting a thread per burst of events",
+    )
+    args = parser.parse_args()
+
     program = Main()
-    program.run()
+
+    if not args.dry_run:
+        if args.asyncio:
+            program.run_async()
+        else:
+            program.run()
+    elif args.output:
+        with open(args.output, "w") as output:
+            program.dry_run(output)
+    else:
+        program.dry_run(sys.stdout)
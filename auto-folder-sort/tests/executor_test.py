@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.executor_test`
+# from the main directory (where main.py is)
+from assets.executor import MoveExecutor
+
+
+## Unit tests ##
+class TestMoveExecutor(unittest.TestCase):
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.folder = self.temp_folder.name
+        self.target = os.path.join(self.folder, "target")
+        os.mkdir(self.target)
+
+        self.moves = []
+        for i in range(20):
+            old_path = os.path.join(self.folder, f"{i}.txt")
+            with open(old_path, "w") as new_file:
+                new_file.write("")
+
+            self.moves.append((old_path, os.path.join(self.target, f"{i}.txt")))
+
+        # Source doesn't exist, so this move fails
+        self.moves.insert(5, (os.path.join(self.folder, "missing.txt"), self.target))
+
+    def tearDown(self):
+        self.temp_folder.cleanup()
+
+    def check_moves(self, errors):
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][0], os.path.join(self.folder, "missing.txt"))
+        self.assertIsInstance(errors[0][2], FileNotFoundError)
+
+        self.assertEqual(len(os.listdir(self.target)), 20)
+
+    def test_sequential(self):
+        self.check_moves(MoveExecutor().run(shutil.move, self.moves))
+
+    def test_pool(self):
+        threads = set()
+
+        def move(old_path, new_path):
+            threads.add(threading.current_thread())
+            shutil.move(old_path, new_path)
+
+        self.check_moves(MoveExecutor(4).run(move, self.moves))
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertLessEqual(len(threads), 4)
+
+    def test_per_device(self):
+        executor = MoveExecutor(2, per_device=True)
+        self.check_moves(executor.run(shutil.move, self.moves))
+
+        self.assertEqual(executor.devices[self.target], os.stat(self.folder).st_dev)
+
+        # Destination folders which don't exist yet use their closest parent
+        self.assertEqual(
+            executor.device(os.path.join(self.target, "new", "item")),
+            os.stat(self.folder).st_dev,
+        )
+
+    def test_unexpected_error(self):
+        def move(old_path, new_path):
+            if old_path.endswith("3.txt"):
+                raise ValueError("not an OSError")
+            shutil.move(old_path, new_path)
+
+        # Raised in both modes, once the other moves are done
+        for executor in (MoveExecutor(), MoveExecutor(4)):
+            with self.assertRaises(ValueError):
+                executor.run(move, self.moves)
+
+            self.assertEqual(
+                sorted(os.listdir(self.target)),
+                sorted(f"{i}.txt" for i in range(20) if i not in (3, 13)),
+            )
+
+            # Put back for the next mode
+            for name in os.listdir(self.target):
+                shutil.move(os.path.join(self.target, name), self.folder)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.extensions_test`
+# from the main directory (where main.py is)
+from assets import constants, extensions
+
+
+## Unit tests ##
+class TestExtensions(unittest.TestCase):
+    def test_index(self):
+        for file_type, file_extensions in constants.FILE_FOLDERS.items():
+            for extension in file_extensions:
+                self.assertIn(extension, extensions.EXTENSION_INDEX)
+
+        # First folder listing an extension wins
+        self.assertEqual(extensions.EXTENSION_INDEX["tar"], "Documents & Data")
+        with self.assertRaises(TypeError):
+            extensions.EXTENSION_INDEX["new"] = "Media"
+
+    def test_lookup(self):
+        self.assertEqual(extensions.lookup("sample.jpeg"), "Media")
+        self.assertEqual(extensions.lookup("SAMPLE.JPG"), "Media")
+        self.assertEqual(extensions.lookup("backup.tar.gz"), "Folders & Archives")
+        self.assertEqual(extensions.lookup("backup.tar"), "Documents & Data")
+        self.assertEqual(extensions.lookup("notes.v2.TXT"), "Documents & Data")
+
+        self.assertIsNone(extensions.lookup("sample"))
+        self.assertIsNone(extensions.lookup("sample.unknown"))
+        self.assertIsNone(extensions.lookup(".zip"))
+        self.assertIsNone(extensions.lookup("sample."))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+import os
+import tempfile
+import time
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.index_test`
+# from the main directory (where main.py is)
+import assets.index
+from assets.index import PlacementIndex, index_path
+from assets.sorter import Sorter
+
+
+## Unit tests ##
+class TestPlacementIndex(unittest.TestCase):
+    def setUp(self):
+        self.state = tempfile.TemporaryDirectory()
+        self.tracked = tempfile.TemporaryDirectory()
+        self.folder = self.tracked.name
+
+        self.index = self.make_index()
+
+    def tearDown(self):
+        self.index.close()
+        self.state.cleanup()
+        self.tracked.cleanup()
+
+    def make_index(self, config="file_type|2020"):
+        return PlacementIndex(
+            index_path(self.state.name, self.folder), self.folder, config
+        )
+
+    def touch(self, name, mtime=None):
+        path = os.path.join(self.folder, name)
+        open(path, "w").close()
+
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+        return path
+
+    def test_index_path(self):
+        self.assertEqual(
+            index_path(self.state.name, self.folder),
+            index_path(self.state.name, self.folder + os.sep),
+        )
+        self.assertNotEqual(
+            index_path(self.state.name, self.folder),
+            index_path(self.state.name, self.state.name),
+        )
+
+    def test_unchanged(self):
+        self.assertFalse(self.index.unchanged())
+
+        self.index.mark_sorted()
+        self.assertTrue(self.index.unchanged())
+
+        # Survives a restart
+        self.index.close()
+        self.index = self.make_index()
+        self.assertTrue(self.index.unchanged())
+
+    def test_changed(self):
+        self.index.mark_sorted()
+
+        # Make sure the new mtime differs on filesystems with coarse timestamps
+        time.sleep(0.01)
+        self.touch("sample.txt")
+
+        self.assertFalse(self.index.unchanged())
+
+    def test_config_changed(self):
+        self.index.mark_sorted()
+        self.index.close()
+
+        self.index = self.make_index("date|2020")
+
+        self.assertFalse(self.index.unchanged())
+
+    def test_kept(self):
+        self.touch("sample.txt")
+        with os.scandir(self.folder) as entries:
+            entry = next(entries)
+
+        self.assertFalse(self.index.is_kept(entry))
+        self.index.keep(entry)
+        self.assertTrue(self.index.is_kept(entry))
+
+        # Modifying the item means it has to be checked again
+        self.touch("sample.txt", time.time() + 10)
+        with os.scandir(self.folder) as entries:
+            entry = next(entries)
+
+        self.assertFalse(self.index.is_kept(entry))
+
+    def test_delta(self):
+        for name in ("old.txt", "modified.txt", "removed.txt"):
+            self.touch(name)
+
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                self.index.keep(entry)
+
+        self.index.save_snapshot()
+        self.index.close()
+        self.index = self.make_index()
+
+        self.touch("modified.txt", time.time() + 10)
+        self.touch("new.txt")
+        os.remove(os.path.join(self.folder, "removed.txt"))
+
+        with os.scandir(self.folder) as entries:
+            delta = self.index.delta(list(entries))
+
+        self.assertEqual(
+            sorted(entry.name for entry in delta), ["modified.txt", "new.txt"]
+        )
+        self.assertEqual(list(self.index.snapshot), ["old.txt"])
+
+    def test_snapshot_config(self):
+        self.touch("kept.txt")
+
+        with os.scandir(self.folder) as entries:
+            self.index.keep(next(entries))
+
+        self.index.mark_sorted()
+        self.index.save_snapshot()
+        self.index.close()
+
+        # Items left in place under another config may need sorting now
+        self.index = self.make_index("date|2020")
+        self.assertEqual(self.index.snapshot, {})
+
+    def test_placements(self):
+        def names():
+            rows = self.index.connection.execute(
+                "SELECT name FROM placements ORDER BY rowid"
+            )
+            return [row[0] for row in rows]
+
+        moves = []
+        for name in ("a.txt", "b.txt", "c.txt"):
+            path = self.touch(name)
+            moves.append((path, path, "extension"))
+        moves.append((os.path.join(self.folder, "gone.txt"), "/missing", "extension"))
+
+        # Only written once flushed, in one go
+        self.index.record_placements(moves)
+        self.assertEqual(names(), [])
+
+        limit = assets.index.PLACEMENTS_LIMIT
+        assets.index.PLACEMENTS_LIMIT = 2
+        try:
+            self.index.flush_placements()
+        finally:
+            assets.index.PLACEMENTS_LIMIT = limit
+
+        # Only the newest are kept
+        self.assertEqual(names(), ["b.txt", "c.txt"])
+
+    def test_sorter_skips_unchanged(self):
+        sorter = Sorter(self.folder, "file_type", lazy_folders=True)
+        sorter.index = self.index
+
+        self.touch("sample.txt")
+        self.assertTrue(sorter.sort(skip_unchanged=True))
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.folder, "Documents & Data", "sample.txt"))
+        )
+
+        placements = self.index.connection.execute(
+            "SELECT name FROM placements"
+        ).fetchall()
+        self.assertEqual(placements, [("sample.txt",)])
+
+        # The sort's own moves changed the folder, so it is listed once more
+        self.assertTrue(sorter.sort(skip_unchanged=True))
+
+        # Nothing has changed, so nothing is planned
+        sorter.plan = None
+        self.assertTrue(sorter.sort(skip_unchanged=True))
+
+    def test_added_while_sorting(self):
+        sorter = Sorter(self.folder, "file_type", lazy_folders=True)
+        sorter.index = self.index
+        self.touch("sample.txt")
+
+        apply = sorter.apply
+
+        def apply_and_add(plan):
+            apply(plan)
+            self.touch("late.txt")
+
+        sorter.apply = apply_and_add
+        self.assertTrue(sorter.sort(skip_unchanged=True))
+        sorter.apply = apply
+
+        # Added after the folder was listed, so it isn't treated as sorted
+        self.assertFalse(self.index.unchanged())
+        self.assertTrue(sorter.sort(skip_unchanged=True))
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.folder, "Documents & Data"))),
+            ["late.txt", "sample.txt"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
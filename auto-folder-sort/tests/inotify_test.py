@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+import unittest
+
+from watchdog.events import FileSystemEventHandler
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.inotify_test`
+# from the main directory (where main.py is)
+from assets.inotify import InotifyLoop
+
+
+class RecordingHandler(FileSystemEventHandler):
+    def __init__(self):
+        self.events = []
+
+    def dispatch(self, event):
+        self.events.append(
+            (event.event_type, event.src_path, getattr(event, "dest_path", None))
+        )
+
+
+## Unit tests ##
+class TestInotifyLoop(unittest.TestCase):
+    def setUp(self):
+        self.temp_folders = [tempfile.TemporaryDirectory() for _ in range(2)]
+        self.folders = [temp_folder.name for temp_folder in self.temp_folders]
+        self.handlers = [RecordingHandler(), RecordingHandler()]
+
+        self.loop = InotifyLoop()
+        self.watches = [
+            self.loop.schedule(handler, folder)
+            for handler, folder in zip(self.handlers, self.folders)
+        ]
+        self.loop.start()
+
+    def tearDown(self):
+        self.loop.stop()
+        self.loop.join()
+
+        for temp_folder in self.temp_folders:
+            temp_folder.cleanup()
+
+    def test_events(self):
+        new_file = os.path.join(self.folders[0], "new.txt")
+        renamed_file = os.path.join(self.folders[0], "renamed.txt")
+        other_file = os.path.join(self.folders[1], "renamed.txt")
+
+        with open(new_file, "w") as text:
+            text.write("")
+        os.rename(new_file, renamed_file)
+        os.rename(renamed_file, other_file)
+        time.sleep(0.2)
+
+        self.assertIn(("created", new_file, None), self.handlers[0].events)
+        self.assertIn(("closed", new_file, None), self.handlers[0].events)
+        self.assertIn(("moved", new_file, renamed_file), self.handlers[0].events)
+        self.assertIn(("deleted", renamed_file, None), self.handlers[0].events)
+        self.assertIn(("created", other_file, None), self.handlers[1].events)
+
+        # Subfolders are not watched
+        os.mkdir(os.path.join(self.folders[1], "sub"))
+        with open(os.path.join(self.folders[1], "sub", "new.txt"), "w") as text:
+            text.write("")
+        time.sleep(0.2)
+
+        for _, path, _ in self.handlers[1].events:
+            self.assertNotIn("new.txt", path)
+
+    def test_unschedule(self):
+        self.loop.unschedule(self.watches[0])
+
+        with open(os.path.join(self.folders[0], "new.txt"), "w") as text:
+            text.write("")
+        time.sleep(0.2)
+
+        self.assertEqual(self.handlers[0].events, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
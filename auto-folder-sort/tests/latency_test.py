@@ -0,0 +1,42 @@
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.latency_test`
+# from the main directory (where main.py is)
+from assets.latency import BUCKETS, LatencyHistogram
+
+
+## Unit tests ##
+class TestLatencyHistogram(unittest.TestCase):
+    def setUp(self):
+        self.histogram = LatencyHistogram()
+
+    def test_empty(self):
+        self.assertEqual(
+            self.histogram.summary(),
+            {"count": 0, "max": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0},
+        )
+
+    def test_percentiles(self):
+        # 1 ms to 1 s
+        for millisecond in range(1, 1001):
+            self.histogram.record(millisecond / 1000)
+
+        summary = self.histogram.summary()
+
+        self.assertEqual(summary["count"], 1000)
+        self.assertEqual(summary["max"], 1.0)
+
+        # Accurate to the width of a bucket
+        for name, expected in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            self.assertGreaterEqual(summary[name], expected)
+            self.assertLessEqual(summary[name], expected * 1.25)
+
+    def test_slower_than_buckets(self):
+        self.histogram.record(BUCKETS[-1] * 10)
+
+        self.assertEqual(self.histogram.percentile(0.5), BUCKETS[-1] * 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
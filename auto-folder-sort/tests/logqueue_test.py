@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.logqueue_test`
+# from the main directory (where main.py is)
+from assets.logqueue import JsonLinesFormatter, listen
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((threading.get_ident(), record.getMessage()))
+
+
+## Unit tests ##
+class TestLogQueue(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(f"{__name__}.{self.id()}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+
+    def test_listen(self):
+        handler = RecordingHandler()
+        listener = listen(self.logger, handler)
+
+        self.logger.info("Moving %s to %s", "a", "b")
+        listener.stop()
+
+        # Written by the listener's thread, formatted lazily
+        self.assertEqual(len(handler.records), 1)
+        thread, message = handler.records[0]
+        self.assertNotEqual(thread, threading.get_ident())
+        self.assertEqual(message, "Moving a to b")
+
+    def test_json_lines(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "moves.jsonl")
+
+            handler = logging.FileHandler(path)
+            handler.setFormatter(JsonLinesFormatter())
+            listener = listen(self.logger, handler)
+
+            self.logger.info("Moved", extra={"fields": {"source": "a"}})
+            self.logger.info("Moved", extra={"fields": {"source": "b"}})
+            listener.stop()
+            handler.close()
+
+            with open(path) as file:
+                lines = [json.loads(line) for line in file]
+
+        self.assertEqual([line["source"] for line in lines], ["a", "b"])
+        self.assertIn("time", lines[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,26 @@
 import logging
 import os
 import shutil
+import tempfile
 import time
 import unittest
 from datetime import datetime
 
-from watchdog.observers.inotify import InotifyObserver
+from watchdog.events import (
+    DirDeletedEvent,
+    DirModifiedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileMovedEvent,
+)
+from watchdog.observers import Observer
 
 # Note that to run this test, you must execute:
 # `python3 -m tests.main_test`
 # from the main directory (where main.py is)
 import main
+from assets.index import PlacementIndex
+from assets.inotify import FileClosedEvent, InotifyLoop
 from assets.sorter import Sorter
 from tests.constants_for_tests import (
     MONTH_NUMBERS,
@@ -223,7 +233,7 @@ class TestMain(unittest.TestCase):
         self.undo_date_sort()
         self.assertEqual(self.temp_dir, SAMPLE_FILES)
 
-        self.assertIsInstance(self.test_observer, InotifyObserver)
+        self.assertIsInstance(self.test_observer, InotifyLoop)
 
         print(
             "\nNote that the following custom error messages are expected."
@@ -241,6 +251,26 @@ class TestMain(unittest.TestCase):
             lambda: self.sample_program.make_observer(SAMPLE_PATH_1, "date", "2018"),
         )
 
+    def test_make_backend(self):
+        backend = main.OBSERVER_BACKEND
+        try:
+            main.OBSERVER_BACKEND = "watchdog"
+            self.assertIsInstance(main.make_backend(), Observer)
+        finally:
+            main.OBSERVER_BACKEND = backend
+
+        # Falls back to watchdog if inotify can't be started
+        def unavailable():
+            raise OSError("inotify unavailable")
+
+        inotify_loop = main.InotifyLoop
+        main.InotifyLoop = unavailable
+        try:
+            with self.assertLogs(main.logger, "ERROR"):
+                self.assertIsInstance(main.make_backend(), Observer)
+        finally:
+            main.InotifyLoop = inotify_loop
+
     def test_add_observer(self):
         # Parameters must be the same as for sample_sorter so
         # undo_date_sort functions as normal
@@ -257,10 +287,10 @@ class TestMain(unittest.TestCase):
 
         self.assertEqual(len(self.sample_program.observers), 2)
         self.assertIsInstance(
-            self.sample_program.observers[SAMPLE_PATH_1], InotifyObserver
+            self.sample_program.observers[SAMPLE_PATH_1], InotifyLoop
         )
         self.assertIsInstance(
-            self.sample_program.observers[SAMPLE_PATH_2], InotifyObserver
+            self.sample_program.observers[SAMPLE_PATH_2], InotifyLoop
         )
 
         # Negative
@@ -281,15 +311,41 @@ class TestMain(unittest.TestCase):
 
         self.assertEqual(len(self.sample_program.observers), 2)
         for observer in self.sample_program.observers.values():
-            self.assertIsInstance(observer, InotifyObserver)
+            self.assertIsInstance(observer, InotifyLoop)
+
+        # Each folder is watched once its first sort is done
+        self.assertEqual(
+            sorted(self.sample_program.startup_durations),
+            sorted([SAMPLE_PATH_1, SAMPLE_PATH_2]),
+        )
+        self.assertEqual(
+            sorted(self.sample_program.watches), sorted([SAMPLE_PATH_1, SAMPLE_PATH_2])
+        )
+
+    def test_startup_sort_process(self):
+        main.STARTUP_POOL = "process"
+        try:
+            self.sample_program.setup_observers()
+        finally:
+            main.STARTUP_POOL = "thread"
+        self.sample_sorter.update_years()
+
+        self.undo_date_sort()
+        self.assertEqual(self.temp_dir, SAMPLE_FILES)
+
+        self.undo_file_sort()
+        for file_type in self.temp_dirs:
+            self.assertEqual(self.temp_dirs[file_type], TEST_FILE_FOLDERS[file_type])
+
+        self.assertEqual(len(self.sample_program.startup_durations), 2)
+        self.assertEqual(len(self.sample_program.watches), 2)
 
     def test_observer_objects(self):
         # START OBSERVERS
         self.sample_program.setup_observers()
         self.sample_sorter.update_years()
 
-        for observer in self.sample_program.observers.values():
-            observer.start()
+        self.sample_program.start_observers()
 
         # NEW FILES
         self.new_file_1 = os.path.join(SAMPLE_PATH_1, "new_file.txt")
@@ -344,6 +400,289 @@ class TestMain(unittest.TestCase):
         os.remove(self.new_file_2)
 
 
+class TestEventHandler(unittest.TestCase):
+    """Tests of the event handler which use a temporary folder, so the
+    Sample Files folders are left untouched."""
+
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.folder = self.temp_folder.name
+        self.event_handler = main.CustomEventHandler(Sorter(self.folder, "file_type"))
+
+    def tearDown(self):
+        self.temp_folder.cleanup()
+
+    def test_is_relevant(self):
+        def relevant(event):
+            return self.event_handler.is_relevant(event)
+
+        new_file = os.path.join(self.folder, "new.txt")
+        sorted_file = os.path.join(self.folder, "Documents & Data", "new.txt")
+
+        self.assertTrue(relevant(DirModifiedEvent(self.folder)))
+        self.assertTrue(relevant(FileCreatedEvent(new_file)))
+        self.assertTrue(relevant(FileMovedEvent(new_file, sorted_file)))
+
+        # Generated sorting folders and anything inside of them are ignored
+        self.assertFalse(relevant(FileCreatedEvent(sorted_file)))
+        self.assertFalse(
+            relevant(DirModifiedEvent(os.path.join(self.folder, "Documents & Data")))
+        )
+        self.assertFalse(relevant(DirModifiedEvent(os.path.dirname(self.folder))))
+
+    def test_root_removed(self):
+        self.assertTrue(self.event_handler.sorter.is_valid())
+        self.temp_folder.cleanup()
+
+        self.event_handler.dispatch(DirDeletedEvent(self.folder))
+
+        self.assertFalse(self.event_handler.sorter.is_valid())
+
+    def test_latency(self):
+        self.event_handler.slow_threshold = 0
+        self.event_handler.scheduler.quiet = 0.01
+
+        new_file = os.path.join(self.folder, "new.txt")
+        open(new_file, "w").close()
+
+        with self.assertLogs(main.logger, "WARNING") as logs:
+            self.event_handler.dispatch(FileCreatedEvent(new_file))
+            self.event_handler.scheduler.flush()
+
+        self.assertEqual(self.event_handler.latency.count, 1)
+        self.assertEqual(self.event_handler.received, {})
+        self.assertIn("Slow event", logs.output[0])
+
+    def test_latency_unsorted(self):
+        handler = self.event_handler
+        paths = [os.path.join(self.folder, name) for name in ("a.txt", "b.txt")]
+        open(paths[0], "w").close()
+
+        # Events dropped from a batch or queue are measured by the full sort
+        handler.received = {path: time.monotonic() for path in paths}
+        handler.reconcile()
+        self.assertEqual(handler.received, {})
+        self.assertEqual(handler.latency.count, 2)
+
+        # Items which weren't moved aren't measured, nor left behind
+        handler.received = {paths[1]: time.monotonic()}
+        handler.sort_batch(paths[1:])
+        self.assertEqual(handler.received, {})
+        self.assertEqual(handler.latency.count, 2)
+
+    def test_batch_not_marked_sorted(self):
+        sorter = self.event_handler.sorter
+        sorter.index = PlacementIndex(":memory:", self.folder)
+        sorter.index.mark_sorted()
+
+        # Only the batch's paths are sorted, so the folder may still need a
+        # full sort on the next startup
+        other_file = os.path.join(self.folder, "other.txt")
+        open(other_file, "w").close()
+        self.event_handler.sort_batch([])
+
+        self.assertFalse(sorter.index.unchanged())
+        sorter.index.close()
+
+    def test_initial_sort_locked(self):
+        handler = self.event_handler
+        sort = handler.sorter.sort
+        locked = []
+
+        def locked_sort(*args, **kwargs):
+            locked.append(handler.sort_lock.locked())
+            return sort(*args, **kwargs)
+
+        # Batches, e.g. of items released by the stability gate, wait for it
+        handler.sorter.sort = locked_sort
+        handler.initial_sort()
+        self.assertEqual(locked, [True])
+        self.assertFalse(handler.sort_lock.locked())
+
+    def test_overflow(self):
+        new_file = os.path.join(self.folder, "new.txt")
+        open(new_file, "w").close()
+
+        # The full sort is only queued, then run by the scheduler
+        self.event_handler.on_overflow()
+        self.assertTrue(os.path.exists(new_file))
+
+        self.event_handler.scheduler.flush()
+        self.assertTrue(
+            os.path.exists(os.path.join(self.folder, "Documents & Data", "new.txt"))
+        )
+        self.assertFalse(self.event_handler.reconcile_pending)
+
+    def test_stability(self):
+        handler = main.CustomEventHandler(
+            Sorter(self.folder, "file_type"), quiet=0.01, stability_quiet=60
+        )
+
+        new_file = os.path.join(self.folder, "new.txt")
+        open(new_file, "w").close()
+
+        # Held back until closed after writing
+        handler.dispatch(FileCreatedEvent(new_file))
+        handler.scheduler.flush()
+        self.assertTrue(os.path.exists(new_file))
+        self.assertTrue(handler.sorter.holding())
+        held_for = time.monotonic() - handler.received[new_file]
+
+        handler.dispatch(FileClosedEvent(new_file))
+        handler.scheduler.flush()
+
+        # Latency is measured from the first event, including the time held
+        self.assertEqual(handler.latency.count, 1)
+        self.assertGreaterEqual(handler.latency.total, held_for)
+        self.assertTrue(
+            os.path.exists(os.path.join(self.folder, "Documents & Data", "new.txt"))
+        )
+        self.assertFalse(handler.sorter.holding())
+
+
+class TestReloadCommands(unittest.TestCase):
+    """Tests of reloading the commands file, which use temporary folders and
+    their own commands file."""
+
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.folders = {}
+        for name in ("a", "b", "c"):
+            self.folders[name] = os.path.join(self.temp_folder.name, name)
+            os.mkdir(self.folders[name])
+
+        self.commands_path = main.COMMANDS_PATH
+        main.COMMANDS_PATH = os.path.join(self.temp_folder.name, "commands.txt")
+        self.write_commands("a | file_type", "b | file_type")
+
+        self.program = main.Main()
+        self.program.setup_observers()
+        self.program.start_observers()
+
+    def tearDown(self):
+        self.program.stop_observers()
+        self.program.close_indexes()
+
+        main.COMMANDS_PATH = self.commands_path
+        self.temp_folder.cleanup()
+
+    def write_commands(self, *lines):
+        """Writes lines to the commands file, with each line's first word
+        replaced by the path of that temporary folder."""
+
+        with open(main.COMMANDS_PATH, "w") as commands:
+            for line in lines:
+                name, rest = line.split(" ", 1)
+                commands.write(f"{self.folders[name]} {rest}\n")
+
+    def test_catch_up(self):
+        c = self.folders["c"]
+        self.write_commands("c | file_type")
+
+        program = main.Main()
+        program.setup_observers()
+        try:
+            # Added after its first sort, but before it was watched
+            open(os.path.join(c, "late.txt"), "w").close()
+            program.start_observers()
+
+            sorted_folder = os.path.join(c, "Documents & Data")
+            self.assertEqual(os.listdir(sorted_folder), ["late.txt"])
+        finally:
+            program.stop_observers()
+            program.close_indexes()
+
+    def test_held_at_shutdown(self):
+        c = self.folders["c"]
+        self.write_commands("c | file_type")
+
+        quiet = main.STABILITY_QUIET
+        main.STABILITY_QUIET = 60
+        try:
+            program = main.Main()
+            program.setup_observers()
+            program.start_observers()
+        finally:
+            main.STABILITY_QUIET = quiet
+
+        # Kept open until the program stops, as closing it would release it
+        # straight away with the inotify backend
+        download = os.path.join(c, "download.txt")
+        with open(download, "w"):
+            handler = program.handlers[c]
+            handler.dispatch(FileCreatedEvent(download))
+            program.stop_observers()
+            program.close_indexes()
+
+        self.assertTrue(os.path.exists(download))
+
+        # Still held when the program stopped, so sorted when it restarts
+        program = main.Main()
+        program.setup_observers()
+        program.close_indexes()
+
+        self.assertFalse(os.path.exists(download))
+        self.assertIn("download.txt", os.listdir(os.path.join(c, "Documents & Data")))
+
+    def test_reload(self):
+        a, b, c = (self.folders[name] for name in ("a", "b", "c"))
+        handler = self.program.handlers[a]
+
+        self.write_commands("a | file_type", "c | date | 2018")
+        added, removed = self.program.reload_commands()
+
+        self.assertEqual((added, removed), ([c], [b]))
+        self.assertEqual(sorted(self.program.observers), [a, c])
+        self.assertEqual(sorted(self.program.watches), [a, c])
+        # Unchanged folders keep their handler, so aren't sorted again
+        self.assertIs(self.program.handlers[a], handler)
+        self.assertIn(str(datetime.today().year), os.listdir(c))
+
+        # Changing a folder's sort type restarts it
+        self.write_commands("a | date | 2018", "c | date | 2018")
+        self.assertEqual(self.program.reload_commands(), ([a], [a]))
+        self.assertIsNot(self.program.handlers[a], handler)
+
+    def test_failed_folder(self):
+        a, b, missing = (self.folders["a"], self.folders["b"], self.folders["c"])
+        shutil.rmtree(missing)
+        self.write_commands("a | file_type", "b | file_type", "c | file_type")
+
+        # Not tracked, so not reported as added nor remembered
+        self.assertEqual(self.program.reload_commands(), ([], []))
+        self.assertEqual(sorted(self.program.observers), [a, b])
+        self.assertEqual([command[0] for command in self.program.commands], [a, b])
+
+        # Retried once the folder exists
+        os.mkdir(missing)
+        self.assertEqual(self.program.reload_commands(), ([missing], []))
+        self.assertIn(missing, self.program.watches)
+
+    def test_invalid(self):
+        self.write_commands("a | file_type", "b | size")
+
+        with self.assertLogs(main.logger, "ERROR"):
+            self.assertEqual(self.program.reload_commands(), ([], []))
+
+        self.assertEqual(len(self.program.observers), 2)
+
+    def test_commands_handler(self):
+        reloads = []
+        handler = main.CommandsEventHandler(
+            main.COMMANDS_PATH, lambda: reloads.append(None), quiet=0.01
+        )
+
+        replacement = f"{main.COMMANDS_PATH}.swp"
+        handler.dispatch(FileCreatedEvent(replacement))
+        handler.dispatch(FileDeletedEvent(main.COMMANDS_PATH))
+        handler.scheduler.flush()
+        self.assertEqual(reloads, [])
+
+        handler.dispatch(FileMovedEvent(replacement, main.COMMANDS_PATH))
+        handler.scheduler.flush()
+        self.assertEqual(reloads, [None])
+
+
 if __name__ == "__main__":
     from tests.sorter_test import TestSorter
 
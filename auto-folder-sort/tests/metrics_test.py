@@ -0,0 +1,118 @@
+import os
+import socket
+import tempfile
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.metrics_test`
+# from the main directory (where main.py is)
+from assets.metrics import NO_TIMER, Metrics, SocketExporter
+from assets.sorter import Sorter
+
+
+## Unit tests ##
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def test_collect(self):
+        self.metrics.inc("moves_total", folder="a")
+        self.metrics.inc("moves_total", 2, folder="a")
+        with self.metrics.timer("phase_seconds", phase="list"):
+            pass
+
+        samples = {
+            name: (labels, value) for name, labels, value in self.metrics.collect()
+        }
+
+        self.assertEqual(samples["auto_folder_sort_moves_total"], ({"folder": "a"}, 3))
+        self.assertEqual(
+            samples["auto_folder_sort_phase_seconds_count"], ({"phase": "list"}, 1)
+        )
+        self.assertGreaterEqual(samples["auto_folder_sort_phase_seconds_sum"][1], 0)
+
+    def test_to_prometheus(self):
+        self.metrics.inc("moves_total", folder='C:\\"new"')
+        self.metrics.observe("move_seconds", 0.5)
+
+        self.assertEqual(
+            self.metrics.to_prometheus(),
+            "# TYPE auto_folder_sort_moves_total counter\n"
+            'auto_folder_sort_moves_total{folder="C:\\\\\\"new\\""} 1\n'
+            "# TYPE auto_folder_sort_move_seconds summary\n"
+            "auto_folder_sort_move_seconds_count 1\n"
+            "auto_folder_sort_move_seconds_sum 0.5\n",
+        )
+
+    def test_histogram(self):
+        histogram = self.metrics.histogram("event_latency_seconds", folder="a")
+        self.assertIs(
+            self.metrics.histogram("event_latency_seconds", folder="a"), histogram
+        )
+
+        histogram.record(0.001)
+        text = self.metrics.to_prometheus()
+
+        self.assertIn("# TYPE auto_folder_sort_event_latency_seconds summary", text)
+        self.assertIn(
+            'auto_folder_sort_event_latency_seconds{folder="a",quantile="0.99"} 0.001',
+            text,
+        )
+        self.assertIn(
+            'auto_folder_sort_event_latency_seconds_count{folder="a"} 1', text
+        )
+
+    def test_write(self):
+        self.metrics.inc("sorts_total")
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "metrics.prom")
+            self.metrics.write(path)
+
+            with open(path) as file:
+                self.assertIn("auto_folder_sort_sorts_total 1", file.read())
+            self.assertEqual(os.listdir(folder), ["metrics.prom"])
+
+    def test_socket(self):
+        self.metrics.inc("sorts_total")
+
+        exporter = SocketExporter(self.metrics, ("127.0.0.1", 0))
+        exporter.start()
+
+        try:
+            with socket.create_connection(exporter.server.server_address) as client:
+                client.sendall(b"GET /metrics HTTP/1.0\r\n\r\n")
+                response = client.makefile("rb").read()
+        finally:
+            exporter.stop()
+
+        self.assertTrue(response.startswith(b"HTTP/1.0 200 OK"))
+        self.assertIn(b"auto_folder_sort_sorts_total 1", response)
+
+    def test_sorter_phases(self):
+        with tempfile.TemporaryDirectory() as folder:
+            open(os.path.join(folder, "sample.txt"), "w").close()
+
+            sorter = Sorter(folder, "file_type")
+            self.assertIs(sorter.timer("list"), NO_TIMER)
+
+            sorter.metrics = self.metrics
+            sorter.sort()
+
+        phases = {
+            labels["phase"]
+            for name, labels, _ in self.metrics.collect()
+            if name == "auto_folder_sort_phase_seconds_count"
+        }
+        self.assertEqual(phases, {"validate", "list", "ensure", "classify", "move"})
+
+        samples = {
+            (name, labels.get("kind")): value
+            for name, labels, value in self.metrics.collect()
+        }
+        self.assertEqual(samples[("auto_folder_sort_moves_total", "renames")], 1)
+        self.assertEqual(samples[("auto_folder_sort_move_seconds_count", None)], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.mover_test`
+# from the main directory (where main.py is)
+from assets import mover
+from assets.mover import Mover
+
+# CONSTANTS
+CONTENTS = b"sample contents\n" * 1000
+
+
+## Unit tests ##
+class TestMover(unittest.TestCase):
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.folder = self.temp_folder.name
+        self.target = os.path.join(self.folder, "target")
+        os.mkdir(self.target)
+
+        self.old_path = os.path.join(self.folder, "sample.txt")
+        self.new_path = os.path.join(self.target, "sample.txt")
+
+        with open(self.old_path, "wb") as sample:
+            sample.write(CONTENTS)
+
+        # Folder containing a file and a symlink, for moving whole folders
+        self.old_folder = os.path.join(self.folder, "sample_folder")
+        os.mkdir(self.old_folder)
+        with open(os.path.join(self.old_folder, "sample.txt"), "wb") as sample:
+            sample.write(CONTENTS)
+        os.symlink("sample.txt", os.path.join(self.old_folder, "link"))
+
+        self.mover = Mover()
+
+    def tearDown(self):
+        self.temp_folder.cleanup()
+
+    def check_moved(self):
+        self.assertFalse(os.path.exists(self.old_path))
+        with open(self.new_path, "rb") as sample:
+            self.assertEqual(sample.read(), CONTENTS)
+
+    def test_rename(self):
+        self.mover.move(self.old_path, self.new_path)
+        self.check_moved()
+
+        self.assertEqual(
+            self.mover.reset_stats(), {"renames": 1, "copies": 0, "bytes_copied": 0}
+        )
+        self.assertEqual(self.mover.reset_stats()["renames"], 0)
+
+    def test_cross_device(self):
+        # Pretend target folder is on another device
+        self.mover.devices[self.target] = -1
+
+        self.mover.move(self.old_path, self.new_path)
+        self.check_moved()
+
+        self.mover.move(self.old_folder, os.path.join(self.target, "sample_folder"))
+        self.assertFalse(os.path.exists(self.old_folder))
+        self.assertEqual(
+            os.readlink(os.path.join(self.target, "sample_folder", "link")),
+            "sample.txt",
+        )
+
+        self.assertEqual(
+            self.mover.reset_stats(),
+            {"renames": 0, "copies": 2, "bytes_copied": 2 * len(CONTENTS)},
+        )
+
+    def test_stream_fallbacks(self):
+        # Each way of copying must give the same result
+        kernel_copies = mover.KERNEL_COPIES
+
+        for copies in ([mover.sendfile], []):
+            mover.KERNEL_COPIES = copies
+
+            try:
+                self.mover.copy_file(self.old_path, self.new_path)
+            finally:
+                mover.KERNEL_COPIES = kernel_copies
+
+            with open(self.new_path, "rb") as sample:
+                self.assertEqual(sample.read(), CONTENTS)
+
+
+if __name__ == "__main__":
+    unittest.main()
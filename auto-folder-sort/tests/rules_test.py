@@ -0,0 +1,137 @@
+import os
+import tempfile
+import time
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.rules_test`
+# from the main directory (where main.py is)
+from assets.rules import IntervalIndex, Rules, load_rules, parse_rule
+from assets.sorter import PathEntry, Sorter
+
+RULES = """# Partial downloads
+*.part | stay
+size > 1 KiB | Large
+invoice_*.pdf | Finance/Invoices
+regex IMG_\\d+\\.jpe?g | Photos
+*.tar.gz | Archives
+age > 30d | Old
+"""
+
+
+## Unit tests ##
+class TestRules(unittest.TestCase):
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.folder = self.temp_folder.name
+
+        self.rules_path = os.path.join(self.folder, "rules.txt")
+        with open(self.rules_path, "w") as rules:
+            rules.write(RULES)
+
+        self.rules = load_rules(self.rules_path)
+
+    def tearDown(self):
+        self.temp_folder.cleanup()
+
+    def touch(self, name, size=0, days_old=0):
+        path = os.path.join(self.folder, name)
+        with open(path, "wb") as file:
+            file.write(b"0" * size)
+
+        if days_old:
+            mtime = time.time() - days_old * 24 * 60 * 60
+            os.utime(path, (mtime, mtime))
+
+        return PathEntry(self.folder, name)
+
+    def matched_line(self, *args, **kwargs):
+        rule = self.rules.match(self.touch(*args, **kwargs))
+        return rule.line if rule is not None else None
+
+    def test_match(self):
+        self.assertEqual(self.matched_line("video.PART", size=2048), 2)
+        self.assertEqual(self.matched_line("big.bin", size=2048), 3)
+        self.assertEqual(self.matched_line("invoice_42.PDF"), 4)
+        self.assertEqual(self.matched_line("IMG_001.jpeg"), 5)
+        self.assertEqual(self.matched_line("backup.tar.gz", days_old=60), 6)
+        self.assertEqual(self.matched_line("notes.txt", days_old=60), 7)
+
+        # Regexes are case sensitive and must match the whole name
+        self.assertIsNone(self.matched_line("img_001.jpeg"))
+        self.assertIsNone(self.matched_line("IMG_001.jpeg.txt"))
+        self.assertIsNone(self.matched_line("notes.txt"))
+
+    def test_first_rule_wins(self):
+        rules = Rules(
+            [
+                parse_rule("report_*.pdf | Reports", 1),
+                parse_rule("*.pdf | Documents", 2),
+                parse_rule("report_2020.pdf | stay", 3),
+            ]
+        )
+
+        self.assertEqual(rules.match(self.touch("report_2020.pdf")).line, 1)
+        self.assertEqual(rules.match(self.touch("other.pdf")).line, 2)
+
+    def test_regex_flags(self):
+        rules = Rules(
+            [
+                parse_rule("regex (?i)invoice_.* | Finance", 1),
+                parse_rule("regex IMG_\\d+\\.jpg | Photos", 2),
+            ]
+        )
+
+        # The flag only applies to its own rule
+        self.assertEqual(rules.match(self.touch("INVOICE_7.pdf")).line, 1)
+        self.assertIsNone(rules.match(self.touch("img_001.jpg")))
+
+    def test_interval_index(self):
+        index = IntervalIndex([(0, 10, 20), (1, 0, 15), (2, 30, float("inf"))], 3)
+
+        self.assertEqual(
+            [index.lookup(value) for value in (0, 9, 10, 19, 20, 29, 30, 1e9)],
+            [1, 1, 0, 0, 3, 3, 2, 2],
+        )
+
+    def test_invalid(self):
+        for line in (
+            "*.txt",
+            "size > 1 XB | Large",
+            "age 10 | Old",
+            "regex ( | Broken",
+            "regex a(?i)b | Flags not at the start",
+            "*.txt | ../Outside",
+        ):
+            with self.assertRaises(ValueError):
+                parse_rule(line, 1)
+
+    def test_sorter(self):
+        for name, size in (("a.part", 2048), ("big.bin", 2048), ("notes.txt", 0)):
+            self.touch(name, size)
+
+        sorter = Sorter(self.folder, "file_type")
+        sorter.rules = self.rules
+
+        destinations = {
+            os.path.basename(source): os.path.relpath(destination, self.folder)
+            for source, destination, _ in sorter.plan()
+        }
+
+        self.assertEqual(
+            destinations,
+            {
+                "big.bin": os.path.join("Large", "big.bin"),
+                "notes.txt": os.path.join("Documents & Data", "notes.txt"),
+                "rules.txt": os.path.join("Documents & Data", "rules.txt"),
+            },
+        )
+
+        # Rule folders are never sorted themselves
+        os.mkdir(os.path.join(self.folder, "Large"))
+        self.assertIn("Large", sorter.generated_folders())
+        self.assertNotIn("Large", [move.source for move in sorter.plan()])
+
+
+if __name__ == "__main__":
+    unittest.main()
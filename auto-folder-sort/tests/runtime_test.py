@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.runtime_test`
+# from the main directory (where main.py is)
+from assets.runtime import AsyncRuntime
+
+
+class FakeHandler:
+    def __init__(self, incremental=True):
+        self.incremental = incremental
+        self.scheduler = None
+        self.batches = []
+        self.reconciles = 0
+
+    def sort_batch(self, paths):
+        self.batches.append(paths)
+
+    def reconcile(self):
+        self.reconciles += 1
+
+
+## Unit tests ##
+class TestAsyncRuntime(unittest.TestCase):
+    def run_runtime(self, handlers, feed, queue_size=100):
+        """Runs an AsyncRuntime for handlers, calling feed() from another
+        thread once started, then shuts it down."""
+
+        async def main():
+            runtime = AsyncRuntime(2, queue_size, 0.05, 1)
+            for handler in handlers:
+                runtime.add(handler)
+
+            feeder = threading.Thread(target=feed)
+            feeder.start()
+            await asyncio.get_running_loop().run_in_executor(None, feeder.join)
+            await asyncio.sleep(0.2)
+
+            await runtime.shutdown()
+            return runtime
+
+        return asyncio.run(main())
+
+    def test_coalesce(self):
+        handler = FakeHandler()
+
+        def feed():
+            for item in ["a", "b", "a", "c"] * 25:
+                handler.scheduler.notify(item)
+
+        self.run_runtime([handler], feed)
+
+        self.assertEqual(handler.batches, [["a", "b", "c"]])
+        self.assertEqual(handler.scheduler.events_received, 100)
+        self.assertEqual(handler.scheduler.runs, 1)
+
+    def test_folders_separate(self):
+        first, second = FakeHandler(), FakeHandler()
+
+        def feed():
+            first.scheduler.notify("a")
+            second.scheduler.notify("b")
+
+        self.run_runtime([first, second], feed)
+
+        self.assertEqual(first.batches, [["a"]])
+        self.assertEqual(second.batches, [["b"]])
+
+    def test_not_incremental(self):
+        handler = FakeHandler(incremental=False)
+
+        def feed():
+            handler.scheduler.notify()
+
+        self.run_runtime([handler], feed)
+
+        self.assertEqual(handler.batches, [[]])
+
+    def test_overflow(self):
+        handler = FakeHandler()
+
+        def feed():
+            for item in range(20):
+                handler.scheduler.notify(item)
+
+        self.run_runtime([handler], feed, queue_size=5)
+
+        # Dropped events are made up for with a full sort
+        self.assertEqual(handler.reconciles, 1)
+
+    def test_shutdown_drains(self):
+        handler = FakeHandler()
+
+        async def main():
+            runtime = AsyncRuntime(1, 100, 10, 10)
+            runtime.add(handler)
+            handler.scheduler.put("a")
+            await runtime.shutdown()
+
+        asyncio.run(main())
+
+        self.assertEqual(handler.batches, [["a"]])
+
+    def test_remove(self):
+        first, second = FakeHandler(), FakeHandler()
+
+        async def main():
+            runtime = AsyncRuntime(1, 100, 10, 10)
+            runtime.add(first)
+            runtime.add(second)
+            first.scheduler.put("a")
+
+            # Pending events are sorted before the folder's task stops
+            await runtime.remove(first)
+            self.assertEqual(first.batches, [["a"]])
+            self.assertEqual(list(runtime.queues), [second])
+
+            await runtime.shutdown()
+
+        asyncio.run(main())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import time
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.scheduler_test`
+# from the main directory (where main.py is)
+from assets.scheduler import DebouncedScheduler
+
+
+## Unit tests ##
+class TestDebouncedScheduler(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+        self.scheduler = DebouncedScheduler(self.batches.append, 0.05, 1)
+
+    def test_coalesce(self):
+        for item in ["a", "b", "a", "c"] * 25:
+            self.scheduler.notify(item)
+
+        time.sleep(0.3)
+
+        self.assertEqual(self.batches, [["a", "b", "c"]])
+        self.assertEqual(self.scheduler.events_received, 100)
+        self.assertEqual(self.scheduler.runs, 1)
+
+    def test_max_latency(self):
+        self.scheduler.max_latency = 0.1
+
+        # Events keep arriving within the quiet window for longer than the
+        # max latency, so the callback must run before the burst is over
+        for _ in range(10):
+            self.scheduler.notify("a")
+            time.sleep(0.03)
+        self.scheduler.flush()
+
+        self.assertGreater(self.scheduler.runs, 1)
+
+    def test_flush(self):
+        self.scheduler.quiet = 10
+        self.scheduler.notify("a")
+        self.scheduler.flush()
+
+        self.assertEqual(self.batches, [["a"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import time
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.sniff_test`
+# from the main directory (where main.py is)
+from assets.sniff import UNKNOWN, Sniffer, identify, read_header
+from assets.sorter import PathEntry, Sorter
+
+
+## Unit tests ##
+class TestIdentify(unittest.TestCase):
+    def test_signatures(self):
+        self.assertEqual(identify(b"\x89PNG\r\n\x1a\n\x00\x00"), "png")
+        self.assertEqual(identify(b"%PDF-1.7\n"), "pdf")
+        self.assertEqual(identify(b"\x00\x00\x00\x18ftypmp42"), "mp4")
+        self.assertEqual(identify(b"\x7fELF\x02\x01\x01"), "bin")
+        self.assertEqual(identify(b"\x00" * 257 + b"ustar\x00"), "tar")
+
+    def test_zip(self):
+        header = b"PK\x03\x04" + b"\x00" * 26
+
+        self.assertEqual(identify(header + b"[Content_Types].xml"), "docx")
+        self.assertEqual(identify(header + b"META-INF/MANIFEST.MF"), "jar")
+        self.assertEqual(identify(header + b"photo.jpg"), "zip")
+
+    def test_text(self):
+        self.assertEqual(identify(b"Shopping list\n- milk\n"), "txt")
+        self.assertEqual(identify("café".encode()[:-1]), "txt")
+        self.assertEqual(identify(b"  <!DOCTYPE html>\n<html>"), "html")
+
+        self.assertEqual(identify(b""), UNKNOWN)
+        self.assertEqual(identify(b"\x01\x02\x00\x03"), UNKNOWN)
+        self.assertEqual(identify(b"\xff\xfe\xfd text"), UNKNOWN)
+
+
+class TestSniffer(unittest.TestCase):
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.folder = self.temp_folder.name
+        self.sniffer = Sniffer(maxsize=2)
+
+    def tearDown(self):
+        self.temp_folder.cleanup()
+
+    def write(self, name, content):
+        with open(os.path.join(self.folder, name), "wb") as file:
+            file.write(content)
+
+        return PathEntry(self.folder, name)
+
+    def test_read_header(self):
+        self.write("large", b"%PDF" + b"0" * 10000)
+
+        header = read_header(os.path.join(self.folder, "large"))
+        self.assertEqual(len(header), 512)
+        self.assertTrue(header.startswith(b"%PDF"))
+
+    def test_classify(self):
+        self.assertEqual(self.sniffer.classify(self.write("photo", b"GIF89a")), "Media")
+        self.assertIsNone(self.sniffer.classify(self.write("blob", b"\x01\x00")))
+
+        os.mkdir(os.path.join(self.folder, "folder"))
+        self.assertIsNone(self.sniffer.classify(PathEntry(self.folder, "folder")))
+
+    def test_cache(self):
+        path = os.path.join(self.folder, "download")
+        self.write("download", b"%PDF-1.4")
+
+        for _ in range(3):
+            entry = PathEntry(self.folder, "download")
+            self.assertEqual(self.sniffer.classify(entry), "Media")
+        self.assertEqual((self.sniffer.reads, self.sniffer.hits), (1, 2))
+
+        # Modifying the file makes it be read again
+        self.write("download", b"\x7fELF")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        self.assertEqual(
+            self.sniffer.classify(PathEntry(self.folder, "download")), "Executables"
+        )
+        self.assertEqual(self.sniffer.reads, 2)
+
+        # Only the most recently used maxsize files are kept
+        self.sniffer.classify(self.write("other", b"OggS"))
+        self.sniffer.classify(self.write("another", b"OggS"))
+        self.assertEqual(len(self.sniffer.cache), 2)
+
+    def test_sorter(self):
+        self.write("scan", b"%PDF-1.4")
+        self.write("mislabeled.xyz", b"\x89PNG\r\n\x1a\n")
+        self.write("labeled.txt", b"\x89PNG\r\n\x1a\n")
+
+        sorter = Sorter(self.folder, "file_type")
+        sorter.sniffer = self.sniffer
+
+        moves = {
+            os.path.basename(source): (
+                os.path.basename(os.path.dirname(destination)),
+                reason,
+            )
+            for source, destination, reason in sorter.plan()
+        }
+
+        self.assertEqual(
+            moves,
+            {
+                "scan": ("Media", "content"),
+                "mislabeled.xyz": ("Media", "content"),
+                # Only files whose extension is unknown are sniffed
+                "labeled.txt": ("Documents & Data", "extension"),
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
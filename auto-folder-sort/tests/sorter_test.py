@@ -1,6 +1,9 @@
 import logging
 import os
+import random
 import shutil
+import tempfile
+import time
 import unittest
 from datetime import datetime
 
@@ -259,5 +262,225 @@ class TestSorter(unittest.TestCase):
             self.assertEqual(self.temp_dirs[file_type], TEST_FILE_FOLDERS[file_type])
 
 
+class TestSortEntry(unittest.TestCase):
+    """Tests incremental sorting of single items, using a temporary folder
+    so the Sample Files folder is left untouched."""
+
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.folder = self.temp_folder.name
+
+        self.file_sorter = Sorter(self.folder, "file_type")
+        self.date_sorter = Sorter(self.folder, "date", 2018)
+
+    def tearDown(self):
+        self.temp_folder.cleanup()
+
+    def make_file(self, name):
+        with open(os.path.join(self.folder, name), "w") as new_file:
+            new_file.write("")
+
+    def test_sort_entry_file(self):
+        self.file_sorter.ensure_file_folders()
+        self.make_file("new.txt")
+        self.make_file("other.jpeg")
+
+        self.assertTrue(self.file_sorter.sort_entry("new.txt"))
+
+        # Only the given item is sorted
+        self.assertIn(
+            "new.txt", os.listdir(os.path.join(self.folder, "Documents & Data"))
+        )
+        self.assertIn("other.jpeg", os.listdir(self.folder))
+
+        # Generated folders and missing items are ignored
+        self.assertFalse(self.file_sorter.sort_entry("Media"))
+        self.assertFalse(self.file_sorter.sort_entry("new.txt"))
+
+    def test_sort_entry_date(self):
+        # Date folders are created on demand if they are missing
+        self.make_file("new.txt")
+
+        self.assertTrue(self.date_sorter.sort_entry("new.txt"))
+
+        today = datetime.today()
+        month = list(constants.MONTHS)[today.month - 1]
+        self.assertIn(
+            "new.txt",
+            os.listdir(
+                os.path.join(
+                    self.folder, str(today.year), f"{constants.MONTHS[month]} {month}"
+                )
+            ),
+        )
+
+    def test_lazy_folders(self):
+        self.date_sorter.lazy_folders = True
+        self.make_file("new.txt")
+
+        # Old enough to be sorted into a year with no other folders
+        old_time = time.mktime((2019, 5, 4, 0, 0, 0, 0, 0, -1))
+        os.utime(os.path.join(self.folder, "new.txt"), (old_time, old_time))
+
+        self.assertTrue(self.date_sorter.sort())
+
+        self.assertEqual(os.listdir(self.folder), ["2019"])
+        self.assertEqual(os.listdir(os.path.join(self.folder, "2019")), ["(5) May"])
+        self.assertIn(
+            os.path.join(self.folder, "2019", "(5) May"), self.date_sorter.known_folders
+        )
+
+        # Removed folders are recreated
+        shutil.rmtree(os.path.join(self.folder, "2019"))
+        self.make_file("new.txt")
+        os.utime(os.path.join(self.folder, "new.txt"), (old_time, old_time))
+        self.assertTrue(self.date_sorter.sort_entry("new.txt"))
+        self.assertEqual(os.listdir(os.path.join(self.folder, "2019")), ["(5) May"])
+
+
+class TestIsValid(unittest.TestCase):
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.temp_folder.name, "tracked")
+        os.mkdir(self.folder)
+
+        self.sorter = Sorter(self.folder, "file_type")
+
+    def tearDown(self):
+        self.temp_folder.cleanup()
+
+    def test_cached(self):
+        self.assertTrue(self.sorter.is_valid())
+
+        # Not checked again until invalidated
+        os.rmdir(self.folder)
+        self.assertTrue(self.sorter.is_valid())
+
+        self.sorter.invalidate()
+        self.assertFalse(self.sorter.is_valid())
+
+        # Invalid results are always checked again
+        os.mkdir(self.folder)
+        self.assertTrue(self.sorter.is_valid())
+
+    def test_date_rollover(self):
+        self.sorter.valid_until = time.time() - 1
+        os.rmdir(self.folder)
+
+        self.assertFalse(self.sorter.is_valid())
+
+    def test_sort_after_removed(self):
+        os.rmdir(self.folder)
+
+        self.assertFalse(self.sorter.sort())
+        self.assertFalse(self.sorter.is_valid())
+
+
+class TestPlan(unittest.TestCase):
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.folder = self.temp_folder.name
+        self.sorter = Sorter(self.folder, "file_type")
+
+        for name in ("sample.txt", "sample.JPG", "sample"):
+            with open(os.path.join(self.folder, name), "w") as new_file:
+                new_file.write("")
+        os.mkdir(os.path.join(self.folder, "sample_folder"))
+
+    def tearDown(self):
+        self.temp_folder.cleanup()
+
+    def test_plan_apply(self):
+        plan = self.sorter.plan()
+
+        # Planning doesn't change anything
+        self.assertEqual(len(os.listdir(self.folder)), 4)
+
+        self.assertEqual(
+            sorted((os.path.basename(move.source), move.reason) for move in plan),
+            [
+                ("sample", "unknown extension"),
+                ("sample.JPG", "extension"),
+                ("sample.txt", "extension"),
+                ("sample_folder", "folder"),
+            ],
+        )
+
+        self.sorter.ensure_file_folders()
+        self.sorter.apply(plan)
+
+        self.assertEqual(
+            sorted(os.listdir(self.folder)), sorted(constants.FILE_FOLDERS)
+        )
+        for move in plan:
+            self.assertTrue(os.path.exists(move.destination))
+        self.assertEqual(self.sorter.move_errors, [])
+
+    def test_apply_errors(self):
+        self.sorter.ensure_file_folders()
+        plan = self.sorter.plan()
+        os.remove(os.path.join(self.folder, "sample.txt"))
+
+        # Removed item fails on its own without stopping the rest
+        self.sorter.apply(plan)
+
+        self.assertEqual(len(self.sorter.move_errors), 1)
+        self.assertEqual(
+            self.sorter.move_errors[0][0], os.path.join(self.folder, "sample.txt")
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.folder)), sorted(constants.FILE_FOLDERS)
+        )
+
+
+class TestBucketMtimes(unittest.TestCase):
+    def setUp(self):
+        self.sorter = Sorter(SAMPLE_PATH, "date", 2018)
+        self.sorter.update_years()
+
+    def ctime_bucket(self, mtime):
+        """How sort_date used to find the folder for a modification time."""
+
+        mod_local_time = time.ctime(mtime).split()
+        mod_month = mod_local_time[1]
+
+        return (mod_local_time[-1], f"{constants.MONTHS[mod_month]} {mod_month}")
+
+    def test_bucket_mtimes(self):
+        start = time.mktime((2018, 1, 1, 0, 0, 0, 0, 0, -1))
+        end = time.time()
+        mtimes = [random.uniform(start, end) for _ in range(10000)]
+
+        # Month boundaries are the most likely to go wrong
+        mtimes += self.sorter.month_starts[:-1]
+        mtimes += [mtime - 1 for mtime in self.sorter.month_starts[1:-1]]
+
+        self.assertEqual(
+            self.sorter.bucket_mtimes(mtimes), list(map(self.ctime_bucket, mtimes))
+        )
+
+    def test_out_of_range(self):
+        self.assertIsNone(self.sorter.bucket_mtime(self.sorter.month_starts[0] - 1))
+
+        # No year folder is made for the future, as it would be sorted itself
+        future = time.mktime((datetime.today().year + 1, 3, 1, 0, 0, 0, 0, 0, -1))
+        self.assertIsNone(self.sorter.bucket_mtime(future))
+
+    def test_future_skipped(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "future.txt")
+            open(path, "w").close()
+
+            future = time.mktime((datetime.today().year + 1, 3, 1, 0, 0, 0, 0, 0, -1))
+            os.utime(path, (future, future))
+
+            sorter = Sorter(folder, "date", lazy_folders=True)
+            for _ in range(2):
+                with self.assertLogs("assets.sorter", "WARNING"):
+                    sorter.sort()
+
+            self.assertEqual(os.listdir(folder), ["future.txt"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,169 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.stability_test`
+# from the main directory (where main.py is)
+from assets.sorter import PathEntry, Sorter
+from assets.stability import StabilityGate, TimerWheel, is_partial
+
+
+## Unit tests ##
+class TestTimerWheel(unittest.TestCase):
+    def setUp(self):
+        self.wheel = TimerWheel(tick=0.01, slots=8)
+        self.fired = []
+        self.done = threading.Event()
+
+    def fire(self, name):
+        self.fired.append(name)
+        if len(self.fired) == 3:
+            self.done.set()
+
+    def test_order(self):
+        # Further away than a full turn of the ring, so waits for extra turns
+        self.wheel.schedule("late", 0.25, lambda: self.fire("late"))
+        self.wheel.schedule("early", 0.02, lambda: self.fire("early"))
+        self.wheel.schedule("middle", 0.1, lambda: self.fire("middle"))
+
+        self.assertTrue(self.done.wait(2))
+        self.assertEqual(self.fired, ["early", "middle", "late"])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_cancel(self):
+        self.wheel.schedule("cancelled", 0.02, lambda: self.fire("cancelled"))
+        self.wheel.schedule("replaced", 0.02, lambda: self.fire("old"))
+        self.wheel.schedule("replaced", 0.04, lambda: self.fire("new"))
+        self.wheel.cancel("cancelled")
+        self.assertEqual(len(self.wheel), 1)
+
+        time.sleep(0.2)
+        self.assertEqual(self.fired, ["new"])
+
+
+class TestStabilityGate(unittest.TestCase):
+    def setUp(self):
+        self.temp_folder = tempfile.TemporaryDirectory()
+        self.folder = self.temp_folder.name
+
+        self.released = []
+        self.release = threading.Event()
+        self.gate = StabilityGate(self.on_release, 0.2, TimerWheel(tick=0.01))
+
+    def tearDown(self):
+        self.gate.clear()
+        self.temp_folder.cleanup()
+
+    def on_release(self, path):
+        self.released.append(path)
+        self.release.set()
+
+    def write(self, name, content=b"0"):
+        with open(os.path.join(self.folder, name), "ab") as file:
+            file.write(content)
+
+        return PathEntry(self.folder, name)
+
+    def test_settled(self):
+        entry = self.write("old.txt")
+        time.sleep(0.25)
+        self.assertTrue(self.gate.admit(entry))
+
+        os.mkdir(os.path.join(self.folder, "folder"))
+        self.assertTrue(self.gate.admit(PathEntry(self.folder, "folder")))
+
+    def test_hold(self):
+        entry = self.write("new.txt")
+        self.assertFalse(self.gate.admit(entry))
+        self.assertFalse(self.gate.admit(entry))
+        self.assertEqual(self.gate.holds, 1)
+
+        # Writing again restarts the wait
+        time.sleep(0.1)
+        self.write("new.txt")
+        self.assertFalse(self.release.wait(0.15))
+
+        self.assertTrue(self.release.wait(1))
+        self.assertEqual(self.released, [entry.path])
+        self.assertEqual(self.gate.held, {})
+
+    def test_closed(self):
+        entry = self.write("new.txt")
+        self.assertFalse(self.gate.admit(entry))
+
+        # Released straight away, then admitted once
+        self.gate.closed_write(entry.path)
+        self.assertEqual(self.released, [entry.path])
+        self.assertTrue(self.gate.admit(entry))
+
+        # Closed and renamed before being seen, but changed since
+        self.write("other.txt")
+        self.gate.closed_write(os.path.join(self.folder, "other.txt"))
+        os.rename(
+            os.path.join(self.folder, "other.txt"),
+            os.path.join(self.folder, "renamed.txt"),
+        )
+        self.gate.renamed(
+            os.path.join(self.folder, "other.txt"),
+            os.path.join(self.folder, "renamed.txt"),
+        )
+        self.assertTrue(self.gate.admit(PathEntry(self.folder, "renamed.txt")))
+
+        self.write("changed.txt")
+        self.gate.closed_write(os.path.join(self.folder, "changed.txt"))
+        self.assertFalse(self.gate.admit(self.write("changed.txt")))
+
+    def test_clear(self):
+        entry = self.write("new.txt")
+        self.assertFalse(self.gate.admit(entry))
+
+        self.gate.clear()
+        self.assertEqual((self.gate.held, len(self.gate.wheel)), ({}, 0))
+        self.assertTrue(self.gate.dropped)
+
+        # Nothing more is held, but files being written still aren't admitted
+        self.assertFalse(self.gate.admit(self.write("other.txt")))
+        self.assertEqual(self.gate.held, {})
+
+    def test_partial(self):
+        self.assertTrue(is_partial("video.mp4.PART"))
+        self.assertFalse(is_partial("partial.txt"))
+
+        entry = self.write("setup.exe.crdownload")
+        time.sleep(0.25)
+        self.assertFalse(self.gate.admit(entry))
+        self.assertEqual(self.gate.held, {})
+
+    def test_sorter(self):
+        self.write("old.txt")
+        self.write("download.pdf.part")
+        time.sleep(0.25)
+        self.write("new.txt")
+
+        sorter = Sorter(self.folder, "date")
+        sorter.stability = self.gate
+
+        self.assertEqual(
+            [os.path.basename(move.source) for move in sorter.plan()], ["old.txt"]
+        )
+        self.assertTrue(sorter.holding())
+        self.assertFalse(sorter.sort_entry("new.txt"))
+
+        self.assertTrue(self.release.wait(1))
+        self.assertFalse(sorter.holding())
+        self.assertTrue(sorter.sort_entry("new.txt"))
+
+        # Files dropped when the gate was cleared still need sorting
+        self.write("newer.txt")
+        self.gate.clear()
+        self.assertNotIn(
+            "newer.txt", [os.path.basename(move.source) for move in sorter.plan()]
+        )
+        self.assertTrue(sorter.holding())
+
+
+if __name__ == "__main__":
+    unittest.main()
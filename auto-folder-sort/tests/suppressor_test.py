@@ -0,0 +1,54 @@
+import os
+import unittest
+
+from watchdog.events import DirModifiedEvent, FileCreatedEvent, FileMovedEvent
+
+# Note that to run this test, you must execute:
+# `python3 -m tests.suppressor_test`
+# from the main directory (where main.py is)
+from assets.suppressor import SelfEventFilter
+
+# CONSTANTS
+ROOT = os.path.join(os.sep, "tracked")
+OLD_PATH = os.path.join(ROOT, "sample.txt")
+NEW_PATH = os.path.join(ROOT, "Documents & Data", "sample.txt")
+
+
+## Unit tests ##
+class TestSelfEventFilter(unittest.TestCase):
+    def setUp(self):
+        self.suppressor = SelfEventFilter()
+
+    def test_no_moves(self):
+        self.assertFalse(self.suppressor.is_own(DirModifiedEvent(ROOT)))
+        self.assertEqual(self.suppressor.suppressed, 0)
+
+    def test_own_move(self):
+        self.suppressor.record(OLD_PATH, NEW_PATH)
+
+        # Events generated by a rename within the tracked folder
+        self.assertTrue(self.suppressor.is_own(FileMovedEvent(OLD_PATH, NEW_PATH)))
+        self.assertTrue(self.suppressor.is_own(DirModifiedEvent(ROOT)))
+        self.assertTrue(
+            self.suppressor.is_own(DirModifiedEvent(os.path.dirname(NEW_PATH)))
+        )
+        self.assertEqual(self.suppressor.suppressed, 3)
+
+        # Only one modification of the tracked folder was caused by the move
+        self.assertFalse(self.suppressor.is_own(DirModifiedEvent(ROOT)))
+
+        # New items in the tracked folder are never suppressed
+        self.assertFalse(
+            self.suppressor.is_own(FileCreatedEvent(os.path.join(ROOT, "new.txt")))
+        )
+        self.assertEqual(self.suppressor.suppressed, 3)
+
+    def test_expiry(self):
+        self.suppressor.ttl = -1
+        self.suppressor.record(OLD_PATH, NEW_PATH)
+
+        self.assertFalse(self.suppressor.is_own(FileMovedEvent(OLD_PATH, NEW_PATH)))
+
+
+if __name__ == "__main__":
+    unittest.main()